@@ -1,10 +1,13 @@
 # External Libraries
 import bcrypt
 from quart import abort, request
+from sqlalchemy import and_
 
 # Sayonika Internals
-from framework.models import Mod, User, ModAuthor
-from framework.objects import jwt_service
+from framework.identity import get_request_user, get_request_token
+from framework.models import ModAuthor
+from framework.objects import hashing_pool
+from framework.token_cache import AuthRecord
 
 
 class Authenticator:
@@ -13,19 +16,22 @@ class Authenticator:
     """
 
     @classmethod
-    async def has_authorized_access(cls, _, **kwargs) -> bool:
-        """Checks if a user has a valid token and has verified email."""
-        token = request.headers.get("Authorization", request.cookies.get("token"))
-
-        if token is None:
-            abort(401, "No token")
+    async def _get_user(cls, no_token_message: str = None) -> AuthRecord:
+        """Gets the requesting user, aborting if the token is missing or invalid."""
+        if get_request_token() is None:
+            abort(401, no_token_message)
 
-        parsed_token = await jwt_service.verify_login_token(token, True)
+        user = await get_request_user()
 
-        if parsed_token is False:
+        if user is None:
             abort(400, "Invalid token")
 
-        user = await User.get(parsed_token["id"])
+        return user
+
+    @classmethod
+    async def has_authorized_access(cls, _, **kwargs) -> bool:
+        """Checks if a user has a valid token and has verified email."""
+        user = await cls._get_user("No token")
 
         if not user.email_verified:
             abort(401, "User email needs to be verified")
@@ -35,14 +41,19 @@ class Authenticator:
             return True
 
         if request.method != "GET":  # Check all methods other than get
-            if "mod_id" in kwargs:
-                user_mods = await Mod.query.where(
-                    ModAuthor.user_id == user.id
-                ).gino.all()
-
-                if not (user.developer or user.moderator) and kwargs["mod_id"] not in (
-                    mod.id for mod in user_mods
-                ):
+            if "mod_id" in kwargs and not user.moderator:
+                is_author = (
+                    await ModAuthor.select("id")
+                    .where(
+                        and_(
+                            ModAuthor.user_id == user.id,
+                            ModAuthor.mod_id == kwargs["mod_id"],
+                        )
+                    )
+                    .gino.scalar()
+                )
+
+                if not is_author:
                     abort(
                         403,
                         "User does not have the required permissions to fulfill the request.",
@@ -53,17 +64,7 @@ class Authenticator:
     @classmethod
     async def has_supporter_features(cls) -> bool:
         """Check if a user is a supporter."""
-        token = request.headers.get("Authorization", request.cookies.get("token"))
-
-        if token is None:
-            abort(401)
-
-        parsed_token = await jwt_service.verify_login_token(token, True)
-
-        if parsed_token is False:
-            abort(400, "Invalid token")
-
-        user = await User.get(parsed_token["id"])
+        user = await cls._get_user()
 
         if not user.supporter:
             abort(
@@ -76,17 +77,7 @@ class Authenticator:
     @classmethod
     async def has_admin_access(cls, developer_only: bool = False) -> bool:
         """Check if a user is an admin."""
-        token = request.headers.get("Authorization", request.cookies.get("token"))
-
-        if token is None:
-            abort(401)
-
-        parsed_token = await jwt_service.verify_login_token(token, True)
-
-        if parsed_token is False:
-            abort(400, "Invalid token")
-
-        user = await User.get(parsed_token["id"])
+        user = await cls._get_user()
 
         if (developer_only and not user.developer) or (
             not developer_only and (not user.moderator and not user.developer)
@@ -99,11 +90,13 @@ class Authenticator:
         return True
 
     @classmethod
-    def hash_password(cls, password: str) -> bytes:
-        """Hashes a password and returns the digest."""
-        return bcrypt.hashpw(password.encode(), bcrypt.gensalt())
+    async def hash_password(cls, password: str) -> bytes:
+        """Hashes a password in the hashing pool and returns the digest."""
+        return await hashing_pool.run(
+            bcrypt.hashpw, password.encode(), bcrypt.gensalt()
+        )
 
     @classmethod
-    def compare_password(cls, password: str, hash_: bytes):
-        """Compares a password against hash_"""
-        return bcrypt.checkpw(password.encode(), hash_)
+    async def compare_password(cls, password: str, hash_: bytes) -> bool:
+        """Compares a password against hash_ in the hashing pool."""
+        return await hashing_pool.run(bcrypt.checkpw, password.encode(), hash_)
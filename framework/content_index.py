@@ -0,0 +1,96 @@
+# Stdlib
+from collections import Counter
+from typing import Any, Dict, List, Optional, Iterable
+
+# External Libraries
+from sqlalchemy.dialects.postgresql import insert
+
+# Sayonika Internals
+from framework.db import db
+import framework.models
+
+__all__ = ("ContentIndex",)
+
+
+class ContentIndex:
+    """
+    Maps the sha256 of uploaded files to their IPFS hash, so files that were uploaded
+    before can be reused without sending them again. Each entry counts the uploads
+    using it, so content is only unpinned once none of them need it anymore.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    async def acquire(self, sha256: str) -> Optional[str]:
+        """
+        Gets the IPFS hash of previously uploaded content, if there is one, counting
+        another use of it.
+        """
+        ContentHash = framework.models.ContentHash
+        ipfs_hash = (
+            await ContentHash.update.values(ref_count=ContentHash.ref_count + 1)
+            .where(ContentHash.sha256 == sha256)
+            .returning(ContentHash.ipfs_hash)
+            .gino.scalar()
+        )
+
+        if ipfs_hash is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+        return ipfs_hash
+
+    async def add(self, sha256: str, ipfs_hash: str):
+        """Records the IPFS hash content was uploaded as."""
+        ContentHash = framework.models.ContentHash
+        query = insert(ContentHash.__table__).values(sha256=sha256, ipfs_hash=ipfs_hash)
+
+        # The same file can be uploaded by two requests before either is recorded.
+        await query.on_conflict_do_update(
+            index_elements=["sha256"],
+            set_={"ref_count": ContentHash.__table__.c.ref_count + 1},
+        ).gino.status()
+
+    async def release(self, ipfs_hashes: Iterable[str]) -> List[str]:
+        """
+        Drops a use of each piece of content, e.g. for a request that failed. Returns
+        the ones nothing else uses, which can be unpinned.
+        """
+        counts = Counter(ipfs_hashes)
+
+        if not counts:
+            return []
+
+        ContentHash = framework.models.ContentHash
+
+        async with db.transaction():
+            for ipfs_hash, count in counts.items():
+                await ContentHash.update.values(
+                    ref_count=ContentHash.ref_count - count
+                ).where(ContentHash.ipfs_hash == ipfs_hash).gino.status()
+
+            used = {
+                x[0]
+                for x in await ContentHash.select("ipfs_hash")
+                .where(ContentHash.ipfs_hash.in_(counts))
+                .where(ContentHash.ref_count > 0)
+                .gino.all()
+            }
+            await ContentHash.delete.where(ContentHash.ipfs_hash.in_(counts)).where(
+                ContentHash.ref_count <= 0
+            ).gino.status()
+
+        return [x for x in counts if x not in used]
+
+    def stats(self) -> Dict[str, Any]:
+        """Dedup hit and miss counters for this worker."""
+        total = self.hits + self.misses
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else None,
+        }
@@ -1,5 +1,20 @@
+# Stdlib
+from contextvars import ContextVar
+import logging
+import time
+from typing import Optional
+
 # External Libraries
 from gino import Gino
+from gino.dialects.asyncpg import AsyncpgDialect, DBAPICursor
+from sqlalchemy.dialects import registry
+
+# Sayonika Internals
+from framework.settings import SETTINGS
+
+__all__ = ("db", "DRIVER", "QueryStats", "current_queries")
+
+logger = logging.getLogger("Sayonika")
 
 # Used to provide predictable names for indexes and the like.
 naming_convention = {
@@ -11,3 +26,61 @@ naming_convention = {
 }
 
 db = Gino(naming_convention=naming_convention)
+
+# Driver name to bind with, for the instrumented dialect below.
+DRIVER = "postgresql+sayonika"
+SLOW_QUERY_THRESHOLD = float(SETTINGS["SLOW_QUERY_THRESHOLD"]) / 1000
+
+
+class QueryStats:
+    """Queries run for a request, or anything else setting `current_queries`."""
+
+    def __init__(self, route: str):
+        self.route = route
+        self.count = 0
+        self.time = 0.0
+        self.slowest: Optional[str] = None
+        self.slowest_time = 0.0
+        self.budget: Optional[int] = None
+
+    def add(self, statement: str, elapsed: float):
+        self.count += 1
+        self.time += elapsed
+
+        if elapsed > self.slowest_time:
+            self.slowest, self.slowest_time = statement, elapsed
+
+
+current_queries: ContextVar[Optional[QueryStats]] = ContextVar(
+    "current_queries", default=None
+)
+
+
+class InstrumentedCursor(DBAPICursor):
+    """Times every statement, and logs the ones slower than `SLOW_QUERY_THRESHOLD`."""
+
+    async def async_execute(self, query, timeout, args, limit=0, many=False):
+        started = time.perf_counter()
+
+        try:
+            return await super().async_execute(query, timeout, args, limit, many)
+        finally:
+            elapsed = time.perf_counter() - started
+            stats = current_queries.get()
+
+            if stats is not None:
+                stats.add(query, elapsed)
+
+            if elapsed >= SLOW_QUERY_THRESHOLD:
+                logger.warning(
+                    f"Slow query ({elapsed * 1000:.1f} ms) on "
+                    f"{stats.route if stats is not None else 'background task'}: "
+                    f"{' '.join(query.split())}"
+                )
+
+
+class InstrumentedDialect(AsyncpgDialect):
+    cursor_cls = InstrumentedCursor
+
+
+registry.register("postgresql.sayonika", "framework.db", "InstrumentedDialect")
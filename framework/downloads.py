@@ -0,0 +1,227 @@
+# Stdlib
+import asyncio
+from datetime import datetime
+import logging
+import time
+from typing import Any, Dict
+from uuid import uuid4
+
+# External Libraries
+from aioredis import RedisError
+from simpleflake import simpleflake
+
+# Sayonika Internals
+from framework.db import db
+
+__all__ = ("DownloadCounter",)
+
+logger = logging.getLogger("Sayonika")
+
+# Moves a bucket's counts aside to be written, so new downloads start a fresh hash
+# while it's being flushed. Buckets that have ended and have nothing left are dropped.
+CLAIM_SCRIPT = """
+if redis.call("EXISTS", KEYS[1]) == 1 then
+    redis.call("RENAME", KEYS[1], KEYS[2])
+    redis.call("SADD", KEYS[4], KEYS[2])
+    return 1
+elseif ARGV[1] == "1" then
+    redis.call("SREM", KEYS[3], ARGV[2])
+end
+return 0
+"""
+WRITE_STATS = """
+    INSERT INTO mod_download_stats
+        (id, created_at, mod_id, bucket, downloads, unique_downloads)
+    SELECT d.id, :now, d.mod_id, :bucket, d.downloads, d.unique_downloads
+    FROM unnest(
+        CAST(:ids AS text[]),
+        CAST(:mod_ids AS text[]),
+        CAST(:downloads AS bigint[]),
+        CAST(:unique_downloads AS bigint[])
+    ) AS d(id, mod_id, downloads, unique_downloads)
+    JOIN mod ON mod.id = d.mod_id
+    ON CONFLICT (mod_id, bucket) DO UPDATE SET
+        downloads = mod_download_stats.downloads + excluded.downloads,
+        unique_downloads = greatest(
+            mod_download_stats.unique_downloads, excluded.unique_downloads
+        )
+"""
+WRITE_TOTALS = """
+    UPDATE mod SET downloads = mod.downloads + d.downloads
+    FROM unnest(CAST(:mod_ids AS text[]), CAST(:downloads AS bigint[]))
+        AS d(mod_id, downloads)
+    WHERE mod.id = d.mod_id
+"""
+
+
+class DownloadCounter:
+    """
+    Counts mod downloads in Redis and writes them to Postgres in batches, so popular
+    mods don't have every download waiting on a lock for their row.
+    Downloads are counted per `bucket_size` seconds, with a HyperLogLog per bucket and
+    mod for unique downloaders. Every flush gets an ID that's recorded in the same
+    transaction as its counts, so a flush that got interrupted can be retried by any
+    worker without counting anything twice.
+    """
+
+    buckets_key = "sayonika:downloads:buckets"
+    flushing_key = "sayonika:downloads:flushing"
+    counts_format = "sayonika:downloads:counts:{}"
+    flush_format = "sayonika:downloads:flush:{}:{}"
+    unique_format = "sayonika:downloads:unique:{}:{}"
+
+    def __init__(
+        self,
+        redis,
+        bucket_size: int = 60 * 60,
+        flush_interval: int = 60,
+        flush_ttl: int = 7 * 24 * 60 * 60,
+        trending=None,
+    ):
+        self.redis = redis
+        self.trending = trending
+        self.bucket_size = bucket_size
+        self.flush_interval = flush_interval
+        self.flush_ttl = flush_ttl
+        self.task = None
+        self.recorded = 0
+        self.flushed = 0
+        self.last_flush = None
+
+    def _bucket(self) -> int:
+        return int(time.time()) // self.bucket_size * self.bucket_size
+
+    async def record(self, mod_id: str, visitor: str):
+        """Counts a download of a mod by a user, or an IP for anonymous downloads."""
+        bucket = self._bucket()
+        unique_key = self.unique_format.format(bucket, mod_id)
+
+        transaction = self.redis.multi_exec()
+        transaction.hincrby(self.counts_format.format(bucket), mod_id, 1)
+        transaction.sadd(self.buckets_key, bucket)
+        transaction.pfadd(unique_key, visitor)
+        # Kept past the end of the bucket, for flushes running late.
+        transaction.expire(unique_key, self.bucket_size * 2)
+
+        try:
+            await transaction.execute()
+        except (RedisError, OSError):
+            # Losing a download count isn't worth failing the download over.
+            logger.exception("Couldn't record download")
+            return
+
+        self.recorded += 1
+
+    async def flush(self) -> int:
+        """Writes every pending download to Postgres. Returns the amount written."""
+        current = self._bucket()
+
+        for bucket in await self.redis.smembers(self.buckets_key):
+            bucket = bucket.decode()
+            await self.redis.eval(
+                CLAIM_SCRIPT,
+                keys=[
+                    self.counts_format.format(bucket),
+                    self.flush_format.format(bucket, uuid4().hex),
+                    self.buckets_key,
+                    self.flushing_key,
+                ],
+                args=[int(int(bucket) < current), bucket],
+            )
+
+        # Also picks up flushes other workers didn't get to finish.
+        flushed = 0
+
+        for key in await self.redis.smembers(self.flushing_key):
+            flushed += await self._write(key.decode())
+
+        self.flushed += flushed
+        self.last_flush = datetime.utcnow()
+
+        return flushed
+
+    async def _write(self, key: str) -> int:
+        bucket, flush_id = key.split(":")[-2:]
+        counts = {
+            k.decode(): int(v) for k, v in (await self.redis.hgetall(key)).items()
+        }
+        mod_ids = list(counts)
+        unique_downloads = await asyncio.gather(
+            *[self.redis.pfcount(self.unique_format.format(bucket, x)) for x in mod_ids]
+        )
+        downloads = [counts[x] for x in mod_ids]
+        written = 0
+
+        async with db.transaction():
+            status, _ = await db.status(
+                db.text("""
+                    INSERT INTO download_flush (id, created_at) VALUES (:id, :now)
+                    ON CONFLICT DO NOTHING
+                    """),
+                id=flush_id,
+                now=datetime.utcnow(),
+            )
+
+            # Otherwise it was written already, and only the cleanup didn't happen.
+            if int(status.split()[-1]) == 1 and mod_ids:
+                await db.status(
+                    db.text(WRITE_STATS),
+                    now=datetime.utcnow(),
+                    bucket=datetime.utcfromtimestamp(int(bucket)),
+                    ids=[str(simpleflake()) for _ in mod_ids],
+                    mod_ids=mod_ids,
+                    downloads=downloads,
+                    unique_downloads=unique_downloads,
+                )
+                await db.status(
+                    db.text(WRITE_TOTALS), mod_ids=mod_ids, downloads=downloads
+                )
+                written = sum(downloads)
+
+        if written and self.trending is not None:
+            await self.trending.add_downloads(counts)
+
+        await self.redis.delete(key)
+        await self.redis.srem(self.flushing_key, key)
+
+        return written
+
+    async def _prune(self):
+        await db.status(
+            db.text("DELETE FROM download_flush WHERE created_at < :before"),
+            before=datetime.utcfromtimestamp(time.time() - self.flush_ttl),
+        )
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+
+            try:
+                await self.flush()
+                await self._prune()
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Download flush failed")
+
+    def start(self):
+        """Starts flushing every `flush_interval` seconds."""
+        self.task = asyncio.ensure_future(self._flush_loop())
+
+    async def stop(self):
+        """Stops flushing, after a last flush so downloads aren't left waiting."""
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+        try:
+            await self.flush()
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Download flush failed")
+
+    def stats(self) -> Dict[str, Any]:
+        """Download counters for this worker."""
+        return {
+            "recorded": self.recorded,
+            "flushed": self.flushed,
+            "last_flush": self.last_flush,
+        }
@@ -8,7 +8,7 @@ from traceback import format_exception
 
 # External Libraries
 from Cryptodome.Cipher import AES
-from quart import Response, request
+from quart import Response
 from quart.exceptions import WERKZEUG_EXCEPTION_CODES as exception_codes
 
 # Sayonika Internals
@@ -34,23 +34,31 @@ exception_handlers = {
 # Custom 429 message
 exception_handlers[429] = error_handler(
     lambda err: make_auto_future(
-        Response(f"Ratelimit for this endpoint: {err.description}", 429)
+        Response(
+            f"Ratelimit for this endpoint: {err.description}",
+            429,
+            (
+                {"Retry-After": err.get_headers()["Retry-After"]}
+                if "Retry-After" in err.get_headers()
+                else {}
+            ),
+        )
     )
 )
 
 
 @error_handler
 async def handle_500(err):
-    from framework.objects import SETTINGS, jwt_service
+    from framework.identity import get_request_user
+    from framework.objects import SETTINGS
 
     tb = "".join(format_exception(type(err), err, err.__traceback__))
-    token = request.headers.get("Authorization", request.cookies.get("token"))
-    parsed = await jwt_service.verify_login_token(token, True)
+    user = await get_request_user()
 
-    if not parsed:
+    if user is None:
         meta = {}
     else:
-        meta = {"id": parsed["id"]}
+        meta = {"id": user.id}
 
     meta["time"] = datetime.utcnow()
 
@@ -0,0 +1,54 @@
+# Stdlib
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Callable
+
+# External Libraries
+from quart import abort
+
+__all__ = ("HashingPool",)
+
+
+class HashingPool:
+    """
+    Bounded pool for running password hashing off of the event loop.
+    bcrypt releases the GIL while it works, so threads are enough to stop a burst of
+    logins from stalling every other request. Once `workers + queue_size` jobs are in
+    flight, new ones are refused with a 503 instead of queueing without limit.
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="hashing")
+        self.in_flight = 0
+        self.rejected = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Amount of jobs waiting for a free worker."""
+        return max(0, self.in_flight - self.workers)
+
+    async def run(self, func: Callable, *args) -> Any:
+        """Runs `func` in the pool, aborting with a 503 if the pool is saturated."""
+        if self.in_flight >= self.workers + self.queue_size:
+            self.rejected += 1
+            abort(503, "Server is busy, try again later")
+
+        self.in_flight += 1
+
+        try:
+            return await asyncio.get_event_loop().run_in_executor(
+                self.executor, func, *args
+            )
+        finally:
+            self.in_flight -= 1
+
+    def stats(self) -> Dict[str, int]:
+        """Queue depth and admission counters for this worker."""
+        return {
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,30 @@
+# Stdlib
+from typing import Optional
+
+# External Libraries
+from quart import g, request
+
+# Sayonika Internals
+from framework.objects import jwt_service
+from framework.token_cache import AuthRecord
+
+__all__ = ("get_request_token", "get_request_user")
+
+
+def get_request_token() -> Optional[str]:
+    """Gets the login token sent with the current request, as a header or cookie."""
+    return request.headers.get("Authorization", request.cookies.get("token"))
+
+
+async def get_request_user() -> Optional[AuthRecord]:
+    """
+    Gets the user that made the current request, or None if no valid token was given.
+    The token is only decoded and its user fetched once per request, with the result
+    kept on `g` so that route wrappers, `get_token_user` and the route itself all share
+    the same lookup.
+    """
+    if "user" not in g:
+        token = get_request_token()
+        g.user = await jwt_service.get_login_user(token) if token else None
+
+    return g.user
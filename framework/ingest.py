@@ -0,0 +1,241 @@
+# Stdlib
+import asyncio
+import base64
+import json
+import logging
+from typing import Dict, List, Optional
+from uuid import uuid4
+
+# External Libraries
+import aiohttp
+from aioredis import RedisError
+
+# Sayonika Internals
+from framework.reliable_queue import ReliableQueue
+import framework.models
+
+__all__ = ("IngestQueue",)
+
+logger = logging.getLogger("Sayonika")
+
+
+class IngestQueue(ReliableQueue):
+    """
+    Queue of mod images waiting to be uploaded to IPFS along with their size variants.
+    """
+
+    name = "ingest"
+    queue_key = "sayonika:ingest:queue"
+    processing_format = "sayonika:ingest:processing:{}:{}"
+    heartbeat_format = "sayonika:ingest:worker:{}"
+    data_format = "sayonika:ingest:data:{}"
+    status_format = "sayonika:ingest:status:{}"
+
+    def __init__(
+        self,
+        redis,
+        ipfs,
+        thumbnails,
+        response_cache,
+        workers: int = 2,
+        retries: int = 3,
+        data_ttl: int = 24 * 60 * 60,
+        heartbeat_ttl: int = 30,
+    ):
+        super().__init__(redis, workers, heartbeat_ttl)
+        self.ipfs = ipfs
+        self.thumbnails = thumbnails
+        self.response_cache = response_cache
+        self.retries = retries
+        self.data_ttl = data_ttl
+
+    async def enqueue(
+        self,
+        mod_id: str,
+        field: str,
+        data: str,
+        filename: str,
+        media_id: Optional[str] = None,
+    ):
+        """
+        Queues base64 image data to be uploaded and stored on `field` of the mod, or on
+        the media with `media_id` when `field` is "media".
+        """
+        job_id = uuid4().hex
+        job = {
+            "id": job_id,
+            "mod_id": mod_id,
+            "field": field,
+            "filename": filename,
+            "media_id": media_id,
+            "attempts": 0,
+        }
+        status_key = self.status_format.format(mod_id)
+
+        transaction = self.redis.multi_exec()
+        transaction.set(self.data_format.format(job_id), data, expire=self.data_ttl)
+        transaction.hincrby(status_key, "total", 1)
+        transaction.expire(status_key, self.data_ttl)
+        transaction.lpush(self.queue_key, json.dumps(job))
+        await transaction.execute()
+
+    async def enqueue_variants(
+        self, mod_id: str, field: str, hash_: str, media_id: Optional[str] = None
+    ):
+        """
+        Queues generating the size variants of an image that's already been uploaded,
+        such as one streamed straight to IPFS.
+        """
+        job = {
+            "id": uuid4().hex,
+            "mod_id": mod_id,
+            "field": field,
+            "hash": hash_,
+            "media_id": media_id,
+            "attempts": 0,
+        }
+        status_key = self.status_format.format(mod_id)
+
+        transaction = self.redis.multi_exec()
+        transaction.hincrby(status_key, "total", 1)
+        transaction.expire(status_key, self.data_ttl)
+        transaction.lpush(self.queue_key, json.dumps(job))
+        await transaction.execute()
+
+    async def status(self, mod_id: str) -> Dict[str, int]:
+        """How many of a mod's queued images are done, failed or still pending."""
+        counts = await self.redis.hgetall(self.status_format.format(mod_id))
+        counts = {k.decode(): int(v) for k, v in counts.items()}
+        total, done, failed = (counts.get(x, 0) for x in ("total", "done", "failed"))
+
+        return {
+            "total": total,
+            "done": done,
+            "failed": failed,
+            "pending": total - done - failed,
+        }
+
+    async def _handle(self, batch: List[bytes], session: aiohttp.ClientSession):
+        for raw in batch:
+            try:
+                job = json.loads(raw)
+            except ValueError:
+                logger.error(f"Dropping malformed ingest job {raw!r}")
+                continue
+
+            await self._process(job, session)
+
+    async def _process(self, job: dict, session: aiohttp.ClientSession):
+        variants: Dict[str, str] = {}
+
+        try:
+            if "hash" in job:
+                # The image itself was uploaded by the request that queued this.
+                hash_ = job["hash"]
+                data = await self.ipfs.cat(hash_, session)
+            else:
+                data = await self.redis.get(self.data_format.format(job["id"]))
+
+                if data is None:
+                    await self._fail(job, session)
+                    return
+
+                data = base64.b64decode(data)
+
+                if "uploaded" not in job:
+                    resp = await self.ipfs.upload(data, job["filename"], session)
+                    # Kept on the job, so that retries don't upload the image again.
+                    job["uploaded"] = resp["Hash"]
+
+                hash_ = job["uploaded"]
+
+            variants = await self._upload_variants(data, job["field"], session)
+            applied = await self._apply(job, hash_, variants or None)
+        except Exception as e:  # pylint: disable=broad-except
+            job["attempts"] += 1
+
+            # Network errors are expected now and then, anything else is worth a look.
+            if not isinstance(e, (aiohttp.ClientError, asyncio.TimeoutError)):
+                logger.exception(f"Ingest job {job['id']} failed")
+
+            # Variants are generated again by the next attempt.
+            await self.ipfs.unpin(variants.values(), session)
+
+            if job["attempts"] < self.retries:
+                await self.redis.lpush(self.queue_key, json.dumps(job))
+            else:
+                logger.error(f"Giving up on ingest job {job['id']}: {e!r}")
+                await self._fail(job, session)
+
+            return
+
+        if not applied:
+            # The mod or media was deleted or got another image in the meantime.
+            owned = [job["uploaded"]] if "uploaded" in job else []
+            await self.ipfs.unpin(owned + list(variants.values()), session)
+
+        await self._finish(job, "done")
+        await self.response_cache.invalidate("mods")
+
+    async def _fail(self, job: dict, session: aiohttp.ClientSession):
+        if "uploaded" in job:
+            await self.ipfs.unpin([job["uploaded"]], session)
+
+        await self._finish(job, "failed")
+
+    async def _finish(self, job: dict, outcome: str):
+        """Counts a job as done or failed, and drops its image data."""
+        status_key = self.status_format.format(job["mod_id"])
+
+        try:
+            transaction = self.redis.multi_exec()
+            transaction.hincrby(status_key, outcome, 1)
+            transaction.delete(self.data_format.format(job["id"]))
+            await transaction.execute()
+        except (RedisError, OSError):
+            # Handling the job again would only repeat its uploads.
+            logger.exception(f"Couldn't count ingest job {job['id']} as {outcome}")
+
+    async def _upload_variants(
+        self, data: bytes, name: str, session: aiohttp.ClientSession
+    ) -> Dict[str, str]:
+        """Generates and uploads the size variants of an image, returning the hashes."""
+        try:
+            thumbnails = await self.thumbnails.generate(data)
+        except Exception:  # pylint: disable=broad-except
+            # Not worth failing the job over, clients fall back to the full image.
+            logger.exception(f"Couldn't generate variants of {name}")
+            return {}
+
+        resps = await self.ipfs.upload_many(
+            [
+                (thumbnail, f"{name}_{variant}.{extension}")
+                for variant, (thumbnail, extension) in thumbnails.items()
+            ],
+            session,
+        )
+
+        return {variant: x["Hash"] for variant, x in zip(thumbnails, resps)}
+
+    @staticmethod
+    async def _apply(job: dict, hash_: str, variants: Optional[dict]) -> bool:
+        Mod, Media = framework.models.Mod, framework.models.Media
+
+        if job["field"] == "media":
+            column = Media.hash
+            query = Media.update.values(hash=hash_, variants=variants).where(
+                Media.id == job["media_id"]
+            )
+        else:
+            column = getattr(Mod, job["field"])
+            query = Mod.update.values(
+                **{job["field"]: hash_, f"{job['field']}_variants": variants}
+            ).where(Mod.id == job["mod_id"])
+
+        if "hash" in job:
+            # Variants only belong to the image they were made from.
+            query = query.where(column == hash_)
+
+        status, _ = await query.gino.status()
+
+        return status != "UPDATE 0"
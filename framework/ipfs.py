@@ -0,0 +1,198 @@
+# Stdlib
+import asyncio
+import hashlib
+import mimetypes
+from typing import List, Tuple, Union, Callable, Iterable, Optional, AsyncIterable
+
+# External Libraries
+import aiohttp
+
+# Sayonika Internals
+from framework.content_index import ContentIndex
+
+__all__ = ("IPFSClient",)
+
+
+class IPFSClient:
+    """
+    Uploads files to an IPFS HTTP API.
+    Every upload goes through a semaphore shared by the whole worker, so a few large
+    mods can't open an unbounded amount of connections to the IPFS node. Failed
+    uploads are retried with backoff, each attempt being limited to `timeout` seconds.
+    """
+
+    def __init__(
+        self,
+        api_url: str,
+        concurrency: int = 8,
+        request_concurrency: int = 4,
+        timeout: float = 30,
+        retries: int = 2,
+        index: Optional[ContentIndex] = None,
+    ):
+        self.api_url = api_url.rstrip("/")
+        self.index = index
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.request_concurrency = request_concurrency
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.retries = retries
+
+    async def _post(
+        self,
+        session: aiohttp.ClientSession,
+        path: str,
+        params: dict = None,
+        form: Callable[[], aiohttp.FormData] = None,
+        retries: Optional[int] = None,
+        timeout: Optional[aiohttp.ClientTimeout] = None,
+        raw: bool = False,
+    ) -> Union[dict, bytes]:
+        retries = self.retries if retries is None else retries
+
+        for attempt in range(retries + 1):
+            try:
+                async with self.semaphore:
+                    # Form data can only be sent once, so it's rebuilt for every try.
+                    async with session.post(
+                        f"{self.api_url}/{path}",
+                        params=params,
+                        data=form() if form is not None else None,
+                        timeout=timeout or self.timeout,
+                    ) as resp:
+                        if raw:
+                            resp.raise_for_status()
+                            return await resp.read()
+
+                        return await resp.json()
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if attempt == retries:
+                    raise
+
+                await asyncio.sleep(0.5 * 2**attempt)
+
+    async def upload(
+        self, file: bytes, filename: str, session: aiohttp.ClientSession
+    ) -> dict:
+        """
+        Uploads and pins a file, returning the node's response with its `Hash`. Files
+        already in the content index aren't sent again, and get `Deduplicated` set.
+        """
+        sha256 = hashlib.sha256(file).hexdigest()
+
+        if self.index is not None:
+            ipfs_hash = await self.index.acquire(sha256)
+
+            if ipfs_hash is not None:
+                return {"Name": filename, "Hash": ipfs_hash, "Deduplicated": True}
+
+        def form():
+            form = aiohttp.FormData()
+            form.add_field(
+                "file",
+                file,
+                filename=filename,
+                content_type=mimetypes.guess_type(filename)[0],
+            )
+
+            return form
+
+        resp = await self._post(session, "add", form=form)
+
+        if self.index is not None:
+            await self.index.add(sha256, resp["Hash"])
+
+        return resp
+
+    async def upload_stream(
+        self,
+        chunks: AsyncIterable[bytes],
+        filename: str,
+        session: aiohttp.ClientSession,
+    ) -> dict:
+        """
+        Uploads and pins a file while it's still being read, so it never has to be in
+        memory all at once. A stream can only be read once, so this isn't retried, and
+        the timeout only applies to waiting on each read, as the speed depends on
+        wherever `chunks` comes from.
+        """
+        digest = hashlib.sha256()
+
+        async def hashed_chunks():
+            async for chunk in chunks:
+                digest.update(chunk)
+                yield chunk
+
+        def form():
+            form = aiohttp.FormData()
+            form.add_field(
+                "file",
+                hashed_chunks(),
+                filename=filename,
+                content_type=mimetypes.guess_type(filename)[0],
+            )
+
+            return form
+
+        resp = await self._post(
+            session,
+            "add",
+            form=form,
+            retries=0,
+            timeout=aiohttp.ClientTimeout(sock_read=self.timeout.total),
+        )
+
+        # The hash is only known once the file's been sent, but it still lets later
+        # uploads of the same file skip the network.
+        if self.index is not None:
+            await self.index.add(digest.hexdigest(), resp["Hash"])
+
+        return resp
+
+    async def cat(self, hash_: str, session: aiohttp.ClientSession) -> bytes:
+        """Downloads a file's content."""
+        return await self._post(session, "cat", params={"arg": hash_}, raw=True)
+
+    async def unpin(self, hashes: Iterable[str], session: aiohttp.ClientSession):
+        """
+        Gives up uploads, e.g. ones made for a request that failed afterwards. With a
+        content index, files are only unpinned once no other upload uses them, so this
+        takes every upload, `Deduplicated` or not.
+        """
+        hashes = list(hashes)
+
+        if self.index is not None:
+            hashes = await self.index.release(hashes)
+
+        await asyncio.gather(
+            *[self._post(session, "pin/rm", params={"arg": x}) for x in hashes],
+            return_exceptions=True,
+        )
+
+    async def upload_many(
+        self, files: List[Tuple[bytes, str]], session: aiohttp.ClientSession
+    ) -> List[dict]:
+        """
+        Uploads files concurrently, returning the responses in the same order.
+        At most `request_concurrency` of them are in flight at once. If any upload
+        fails, the rest are cancelled and the ones already done get unpinned.
+        """
+        semaphore = asyncio.Semaphore(self.request_concurrency)
+
+        async def upload(file: bytes, filename: str) -> dict:
+            async with semaphore:
+                return await self.upload(file, filename, session)
+
+        tasks = [asyncio.ensure_future(upload(*x)) for x in files]
+
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+
+            await asyncio.gather(*tasks, return_exceptions=True)
+            done = [
+                x.result() for x in tasks if not x.cancelled() and not x.exception()
+            ]
+            await self.unpin([x["Hash"] for x in done], session)
+            raise
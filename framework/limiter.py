@@ -1,13 +1,77 @@
 """
-Custom key function for flask-limiter.
-Probably needs to be in its own file due to Quart's flask patching.
-(We should probably port limiter to Quart properly (or just wait for FastAPI rewrite lol))
+Rate limiting, enforced across every worker through Redis.
+Limits use the same notation as flask-limiter, e.g. "5 per 2 seconds;1000 per hour".
 """
+
+# Stdlib
+from functools import wraps
+import hashlib
+import logging
+import re
+import time
+from typing import Any, Dict, List, Callable, NamedTuple
+
 # External Libraries
-from flask import request
+from aioredis import RedisError
+from cachetools import LRUCache
+from quart import Quart, request
+from quart.exceptions import all_http_exceptions
+
+__all__ = ("RateLimit", "RateLimiter", "RateLimitExceeded", "get_ratelimit_key")
+
+logger = logging.getLogger("Sayonika")
+
+LIMIT_RE = re.compile(r"^\s*(\d+)\s*(?:/|per)\s*(\d+)?\s*([a-z]+?)s?\s*$")
+PERIODS = {
+    "second": 1,
+    "minute": 60,
+    "hour": 60 * 60,
+    "day": 24 * 60 * 60,
+    "month": 30 * 24 * 60 * 60,
+    "year": 365 * 24 * 60 * 60,
+}
+
+# GCRA over every limit of a request at once, so a request denied by one limit isn't
+# counted against the others. Each limit asks for up to `cost` requests, the extra
+# ones being leased to the worker, and gets however many it can have right now.
+# Returns `{1, granted...}` or `{0, milliseconds until allowed}`.
+GCRA_SCRIPT = """
+redis.replicate_commands()
+local time = redis.call("TIME")
+local now = tonumber(time[1]) * 1000 + tonumber(time[2]) / 1000
+local tats = {}
+local granted = {1}
+local retry_after = 0
+
+for i, key in ipairs(KEYS) do
+    local count = tonumber(ARGV[i * 3 - 2])
+    local period = tonumber(ARGV[i * 3 - 1])
+    local cost = tonumber(ARGV[i * 3])
+    local interval = period / count
+    local tat = math.max(tonumber(redis.call("GET", key)) or now, now)
+    local available = math.floor((period - (tat - now)) / interval)
 
+    if available < 1 then
+        retry_after = math.max(retry_after, tat + interval - period - now)
+    end
 
-def get_ratelimit_key():
+    granted[i + 1] = math.min(cost, available)
+    tats[i] = tat + interval * granted[i + 1]
+end
+
+if retry_after > 0 then
+    return {0, math.ceil(retry_after)}
+end
+
+for i, key in ipairs(KEYS) do
+    redis.call("SET", key, tostring(tats[i]), "PX", math.ceil(tats[i] - now))
+end
+
+return granted
+"""
+
+
+def get_ratelimit_key() -> str:
     token = request.headers.get("Authorization", request.cookies.get("token"))
 
     if token:
@@ -15,3 +79,175 @@ def get_ratelimit_key():
     if request.access_route:
         return request.access_route[0]
     return request.remote_addr
+
+
+class RateLimit(NamedTuple):
+    """A limit of `count` requests every `period` seconds."""
+
+    count: int
+    period: int
+    text: str
+
+    @classmethod
+    def parse_many(cls, text: str) -> List["RateLimit"]:
+        """Parses limits separated by `;` or `,`."""
+        limits = []
+
+        for part in re.split(r"[;,]", text):
+            if not part.strip():
+                continue
+
+            match = LIMIT_RE.match(part.lower())
+
+            if match is None or match[3] not in PERIODS:
+                raise ValueError(f"Invalid rate limit {repr(part)}")
+
+            count, multiple, unit = match.groups()
+            limits.append(
+                cls(int(count), int(multiple or 1) * PERIODS[unit], part.strip())
+            )
+
+        return limits
+
+
+class RateLimitExceeded(all_http_exceptions[429]):
+    """Raised for requests over a limit. Handled like any other 429."""
+
+    def __init__(self, limits: List[RateLimit], retry_after: float):
+        super().__init__()
+        self.description = ";".join(x.text for x in limits)
+        self.retry_after = retry_after
+
+    def get_headers(self) -> dict:
+        return {**super().get_headers(), "Retry-After": str(int(self.retry_after) + 1)}
+
+
+class RateLimiter:
+    """
+    Asynchronous rate limiter using GCRA in Redis, so limits hold across workers.
+    Each check leases up to `1 / lease_divisor` of a limit's requests to the worker, at
+    most `max_lease`, which then lets them through without going to Redis. A lease
+    can't outlast the time its requests would have taken, so limits can't be
+    exceeded, but requests leased to a worker that stops receiving them are lost.
+    If Redis is unavailable, requests are let through.
+    """
+
+    key_format = "sayonika:ratelimit:{}:{}:{}:{}"
+
+    def __init__(
+        self,
+        redis,
+        key_func: Callable[[], str],
+        default_limits: str = "",
+        lease_divisor: int = 2,
+        max_lease: int = 10,
+        lease_cache_size: int = 10000,
+    ):
+        self.redis = redis
+        self.key_func = key_func
+        self.default_limits = RateLimit.parse_many(default_limits)
+        self.lease_divisor = lease_divisor
+        self.max_lease = max_lease
+        self.leases = LRUCache(lease_cache_size)
+        self.counters = {"local": 0, "redis": 0, "rejected": 0, "errors": 0}
+
+    def init_app(self, app: Quart):
+        """Applies the default limits to every route of an app, per route."""
+
+        @app.before_request
+        async def check_default_limits():
+            if not self.default_limits or request.endpoint is None:
+                return
+
+            # Routes are registered as partials of their cog's method.
+            view = app.view_functions.get(request.endpoint)
+            view = getattr(view, "func", view)
+
+            if not getattr(view, "overrides_default_limits", False):
+                await self.hit(request.endpoint, self.default_limits)
+
+    def limit(self, limits: str, override_defaults: bool = True):
+        """
+        Decorator limiting a route. Like Flask-Limiter, the route's limits replace the
+        default ones, unless `override_defaults` is False.
+        """
+        parsed = RateLimit.parse_many(limits)
+
+        def decorator(func):
+            namespace = f"{func.__module__}.{func.__qualname__}"
+
+            @wraps(func)
+            async def inner(*args, **kwargs):
+                await self.hit(namespace, parsed)
+                return await func(*args, **kwargs)
+
+            # Carried over to the view by the decorators above, as they use `wraps`.
+            inner.overrides_default_limits = override_defaults
+
+            return inner
+
+        return decorator
+
+    async def hit(self, namespace: str, limits: List[RateLimit]):
+        """Counts a request against limits, aborting with a 429 if any is exceeded."""
+        identity = hashlib.sha256(self.key_func().encode()).hexdigest()[:32]
+        now = time.monotonic()
+        leased = []
+        remote = []
+
+        for limit in limits:
+            key = self.key_format.format(namespace, identity, limit.count, limit.period)
+            lease = self.leases.get(key)
+
+            if lease is not None and lease[0] > 0 and lease[1] > now:
+                leased.append(lease)
+            else:
+                remote.append((key, limit))
+
+        if remote:
+            args = []
+
+            for _, limit in remote:
+                args += [limit.count, limit.period * 1000, self._lease_size(limit)]
+
+            try:
+                result = await self.redis.eval(
+                    GCRA_SCRIPT, keys=[x for x, _ in remote], args=args
+                )
+            except (RedisError, OSError):
+                self.counters["errors"] += 1
+                logger.exception("Couldn't check rate limits")
+                return
+
+            if not result[0]:
+                self.counters["rejected"] += 1
+                raise RateLimitExceeded([x for _, x in remote], result[1] / 1000)
+
+            self.counters["redis"] += 1
+
+            for (key, limit), granted in zip(remote, result[1:]):
+                if granted > 1:
+                    # One of the granted requests is this one.
+                    self.leases[key] = [
+                        granted - 1,
+                        now + limit.period / limit.count * granted,
+                    ]
+        else:
+            self.counters["local"] += 1
+
+        # Only taken once every limit let the request through, so that being denied by
+        # one of them doesn't use up the leases of the others.
+        for lease in leased:
+            lease[0] -= 1
+
+    def _lease_size(self, limit: RateLimit) -> int:
+        return max(1, min(limit.count // self.lease_divisor, self.max_lease))
+
+    def stats(self) -> Dict[str, Any]:
+        """Where requests were decided, for this worker."""
+        total = self.counters["local"] + self.counters["redis"]
+
+        return {
+            **self.counters,
+            "local_ratio": self.counters["local"] / total if total else None,
+        }
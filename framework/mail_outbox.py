@@ -0,0 +1,249 @@
+# Stdlib
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+
+# External Libraries
+import aiohttp
+
+# Sayonika Internals
+from framework.mailer import EmailFailed, MailTemplates, MissingReplacers
+from framework.reliable_queue import ReliableQueue
+
+__all__ = ("MailOutbox",)
+
+logger = logging.getLogger("Sayonika")
+
+# Moves delayed jobs that are due back onto the queue.
+RELEASE_SCRIPT = """
+local jobs = redis.call("ZRANGEBYSCORE", KEYS[1], "-inf", ARGV[1], "LIMIT", 0, ARGV[2])
+for _, job in ipairs(jobs) do
+    redis.call("ZREM", KEYS[1], job)
+    redis.call("LPUSH", KEYS[2], job)
+end
+return #jobs
+"""
+
+
+class MailOutbox(ReliableQueue):
+    """
+    Queue of outgoing mail, so requests don't wait on Mailgun. Each worker takes up to
+    `batch_size` mails at a time and sends the ones using the same template in a single
+    Mailgun request. Mail that fails to send is retried with exponential backoff, and
+    after `retries` attempts, or if Mailgun refuses it outright, is kept in a capped
+    dead letter list to be looked at and requeued.
+    """
+
+    name = "mail"
+    queue_key = "sayonika:mail:queue"
+    delayed_key = "sayonika:mail:delayed"
+    dead_key = "sayonika:mail:dead"
+    processing_format = "sayonika:mail:processing:{}:{}"
+    heartbeat_format = "sayonika:mail:worker:{}"
+
+    def __init__(
+        self,
+        redis,
+        mailer,
+        workers: int = 1,
+        retries: int = 5,
+        batch_size: int = 100,
+        backoff: int = 30,
+        dead_size: int = 1000,
+        heartbeat_ttl: int = 30,
+    ):
+        super().__init__(redis, workers, heartbeat_ttl)
+        self.mailer = mailer
+        self.retries = retries
+        # Mailgun takes at most 1000 recipients per request.
+        self.batch_size = min(batch_size, 1000)
+        self.backoff = backoff
+        self.dead_size = dead_size
+        self.counters = {"sent": 0, "requests": 0, "retried": 0, "dead": 0}
+
+    async def enqueue(
+        self, mail_type: MailTemplates, recipient: str, replacers: Dict[str, str]
+    ):
+        """Queues mail to be sent, with the same arguments as `Mailer.send_mail`."""
+        if not isinstance(mail_type, MailTemplates):
+            raise TypeError("mail_type isn't a valid type")
+
+        job = {
+            "id": uuid4().hex,
+            "type": mail_type.value,
+            "recipient": recipient,
+            "replacers": replacers,
+            "attempts": 0,
+        }
+
+        await self.redis.lpush(self.queue_key, json.dumps(job))
+
+    async def dead_letters(self, limit: int = 100) -> List[dict]:
+        """Gets the most recent mail that was given up on."""
+        return [
+            json.loads(x) for x in await self.redis.lrange(self.dead_key, 0, limit - 1)
+        ]
+
+    async def requeue_dead(self) -> int:
+        """Queues every dead letter to be sent again. Returns how many there were."""
+        requeued = 0
+
+        while True:
+            raw = await self.redis.rpop(self.dead_key)
+
+            if raw is None:
+                return requeued
+
+            job = json.loads(raw)
+
+            if "raw" in job:
+                # Malformed mail can't be sent either way.
+                continue
+
+            job["attempts"] = 0
+            job.pop("error", None)
+            await self.redis.lpush(self.queue_key, json.dumps(job))
+            requeued += 1
+
+    async def lengths(self) -> Dict[str, int]:
+        """How much mail is queued, waiting to be retried, or dead."""
+        transaction = self.redis.multi_exec()
+        transaction.llen(self.queue_key)
+        transaction.zcard(self.delayed_key)
+        transaction.llen(self.dead_key)
+        queued, delayed, dead = await transaction.execute()
+
+        return {"queued": queued, "delayed": delayed, "dead": dead}
+
+    async def _on_heartbeat(self):
+        await self.redis.eval(
+            RELEASE_SCRIPT,
+            keys=[self.delayed_key, self.queue_key],
+            args=[time.time(), self.batch_size],
+        )
+
+    @staticmethod
+    def _parse(raw: bytes) -> Optional[dict]:
+        try:
+            job = json.loads(raw)
+            MailTemplates(job["type"])
+            job["recipient"], job["attempts"], dict(job["replacers"])
+        except (ValueError, KeyError, TypeError):
+            return None
+
+        return job
+
+    @staticmethod
+    def _group(jobs: List[dict]) -> List[List[dict]]:
+        """
+        Splits jobs into ones that can be sent together, having the same template and
+        replacer names, and no recipient twice.
+        """
+        groups: Dict[tuple, List[List[dict]]] = {}
+
+        for job in jobs:
+            key = (job["type"], tuple(sorted(job["replacers"])))
+            batches = groups.setdefault(key, [[]])
+
+            if any(x["recipient"] == job["recipient"] for x in batches[-1]):
+                batches.append([])
+
+            batches[-1].append(job)
+
+        return [x for batches in groups.values() for x in batches]
+
+    async def _handle(self, batch: List[bytes], session: aiohttp.ClientSession):
+        jobs = []
+        malformed = []
+
+        for raw in batch:
+            job = self._parse(raw)
+
+            if job is None:
+                malformed.append(raw)
+            else:
+                jobs.append(job)
+
+        if malformed:
+            logger.error(f"Dropping {len(malformed)} malformed mails")
+            transaction = self.redis.multi_exec()
+
+            for raw in malformed:
+                transaction.lpush(
+                    self.dead_key,
+                    json.dumps(
+                        {"raw": raw.decode(errors="replace"), "error": "Malformed"}
+                    ),
+                )
+
+            transaction.ltrim(self.dead_key, 0, self.dead_size - 1)
+            await transaction.execute()
+            self.counters["dead"] += len(malformed)
+
+        for group in self._group(jobs):
+            await self._send_group(group, session)
+
+    async def _send_group(self, group: List[dict], session: aiohttp.ClientSession):
+        mail_type = MailTemplates(group[0]["type"])
+
+        try:
+            if len(group) == 1:
+                await self.mailer.send_mail(
+                    mail_type, group[0]["recipient"], group[0]["replacers"], session
+                )
+            else:
+                await self.mailer.send_batch(
+                    mail_type, {x["recipient"]: x["replacers"] for x in group}, session
+                )
+        except EmailFailed as e:
+            # Anything but rate limiting is a problem with the mail itself.
+            permanent = 400 <= e.status < 500 and e.status != 429
+
+            if permanent and len(group) > 1:
+                # Likely a single bad address, so the rest is sent on its own to
+                # only give up on the mail that fails again.
+                for job in group:
+                    await self._send_group([job], session)
+            else:
+                await self._fail(group, str(e), permanent)
+
+            return
+        except (FileNotFoundError, MissingReplacers) as e:
+            await self._fail(group, str(e), True)
+            return
+        except Exception as e:  # pylint: disable=broad-except
+            # Network errors, and anything else unexpected, are worth another try.
+            if not isinstance(e, (aiohttp.ClientError, asyncio.TimeoutError)):
+                logger.exception("Sending mail failed")
+
+            await self._fail(group, repr(e), False)
+            return
+
+        self.counters["requests"] += 1
+        self.counters["sent"] += len(group)
+
+    async def _fail(self, jobs: List[dict], error: str, permanent: bool):
+        transaction = self.redis.multi_exec()
+
+        for job in jobs:
+            job["attempts"] += 1
+            job["error"] = error
+
+            if permanent or job["attempts"] > self.retries:
+                logger.error(f"Giving up on mail {job['id']}: {error}")
+                transaction.lpush(self.dead_key, json.dumps(job))
+                self.counters["dead"] += 1
+            else:
+                delay = self.backoff * 2 ** (job["attempts"] - 1)
+                transaction.zadd(self.delayed_key, time.time() + delay, json.dumps(job))
+                self.counters["retried"] += 1
+
+        transaction.ltrim(self.dead_key, 0, self.dead_size - 1)
+        await transaction.execute()
+
+    def stats(self) -> Dict[str, Any]:
+        """Mail counters for this worker."""
+        return {"workers": self.workers, **self.counters}
@@ -1,13 +1,17 @@
 # Stdlib
 from enum import Enum
-import os.path as osp
-from typing import Dict
+import json
+import os
+import re
+import time
+from typing import Dict, Tuple, NamedTuple
 
 # External Libraries
 import aiofiles
 import aiohttp
 
 TEMPLATES_PATH = "./framework/mail_templates/__.html"
+PLACEHOLDER_RE = re.compile(r"{{(\w+)}}")
 
 
 class MailTemplates(Enum):
@@ -31,36 +35,121 @@ class MailSubjects:
 
 
 class EmailFailed(Exception):
-    pass
+    def __init__(self, status: int):
+        super().__init__(f"Mailgun responded with {status}")
+        self.status = status
 
 
-class Mailer:
-    """Sending mail templates via Mailgun."""
+class MissingReplacers(ValueError):
+    def __init__(self, template: str, names: set):
+        super().__init__(
+            f"Template `{template}` needs {', '.join(sorted(names))} to be replaced"
+        )
+        self.names = names
+
+
+class CompiledTemplate(NamedTuple):
+    """
+    A template split around its `{{NAME}}` placeholders, so rendering is a single
+    join rather than a pass over the whole template for every replacer.
+    """
+
+    name: str
+    # Literal text, with placeholder names at every odd index.
+    parts: Tuple[str, ...]
+    mtime: float
+
+    @classmethod
+    def compile(cls, name: str, source: str, mtime: float) -> "CompiledTemplate":
+        return cls(name, tuple(PLACEHOLDER_RE.split(source)), mtime)
+
+    @property
+    def names(self) -> Tuple[str, ...]:
+        return self.parts[1::2]
+
+    def render(self, replacers: Dict[str, str]) -> str:
+        missing = set(self.names) - replacers.keys()
+
+        if missing:
+            raise MissingReplacers(self.name, missing)
+
+        parts = list(self.parts)
+        parts[1::2] = [replacers[x] for x in self.names]
 
-    # XXX: switch to redis soon
-    cached_templates = {}
+        return "".join(parts)
 
-    def __init__(self, settings: dict):
+
+class Mailer:
+    """
+    Sending mail templates via Mailgun.
+    Templates are compiled once per process, and recompiled when their file changes,
+    which is checked at most every `check_interval` seconds.
+    """
+
+    def __init__(self, settings: dict, check_interval: float = 5):
         # `settings` is the dict of all ENV vars starting with SAYONIKA_
         self.mailgun_key = settings["MAILGUN_KEY"]
-
-    async def _get_template(self, template: MailTemplates) -> str:
+        self.api_url = settings["MAILGUN_API"].rstrip("/")
+        self.check_interval = check_interval
+        self.templates: Dict[str, CompiledTemplate] = {}
+        self.checked_at: Dict[str, float] = {}
+
+    async def load_templates(self):
+        """Compiles every template up front, so the first mails don't have to."""
+        for template in MailTemplates:
+            try:
+                await self._get_template(template)
+            except FileNotFoundError:
+                pass
+
+    async def _get_template(self, template: MailTemplates) -> CompiledTemplate:
         template_name = template.value
         template_path = TEMPLATES_PATH.replace("__", template_name)
+        compiled = self.templates.get(template_name)
+        now = time.monotonic()
+
+        if (
+            compiled is not None
+            and now - self.checked_at[template_name] < self.check_interval
+        ):
+            return compiled
 
-        # Get from cache early if possible
-        if template_name in self.cached_templates:
-            return self.cached_templates[template_name]
+        try:
+            mtime = os.stat(template_path).st_mtime
+        except FileNotFoundError:
+            raise FileNotFoundError(
+                f"Template `{template_name}` doesn't exist"
+            ) from None
 
-        if not osp.exists(template_path):
-            raise FileNotFoundError(f"Template `{template_name}` doesn't exist")
+        self.checked_at[template_name] = now
+
+        if compiled is not None and compiled.mtime == mtime:
+            return compiled
 
         async with aiofiles.open(template_path) as f:
-            data = await f.read()
+            compiled = CompiledTemplate.compile(template_name, await f.read(), mtime)
+
+        self.templates[template_name] = compiled
 
-        self.cached_templates[template_name] = data
+        return compiled
 
-        return data
+    async def _render(self, mail_type: MailTemplates, replacers: Dict[str, str]) -> str:
+        if not isinstance(mail_type, MailTemplates):
+            raise TypeError("mail_type isn't a valid type")
+
+        return (await self._get_template(mail_type)).render(replacers)
+
+    async def _send(self, msg: dict, session: aiohttp.ClientSession):
+        try:
+            async with session.post(
+                f"{self.api_url}/messages",
+                auth=aiohttp.BasicAuth("api", self.mailgun_key),
+                data=msg,
+            ) as resp:
+                if resp.status != 200:
+                    raise EmailFailed(resp.status)
+        except aiohttp.ClientResponseError as e:
+            raise EmailFailed(e.status) from e
 
     async def send_mail(
         self,
@@ -73,28 +162,36 @@ class Mailer:
         Send mail using a template, along with optionally replacing some values.
         Templates can be found in `framework/mail_templates`.
         """
-        if not isinstance(mail_type, MailTemplates):
-            raise TypeError("mail_type isn't a valid type")
-
-        template = await self._get_template(mail_type)
+        msg = {
+            "from": "Sayonika <noreply@sayonika.moe>",
+            "subject": getattr(MailSubjects, mail_type.value),
+            "to": [recipient],
+            "html": await self._render(mail_type, replacers),
+        }
 
-        for (replace_string, replace_value) in replacers.items():
-            # Five pairs of braces are needed, as `{{}}` escapes into `{}`, so we need to double that up and then also
-            # interpolate our variable into them
-            template = template.replace(f"{{{{{replace_string}}}}}", replace_value)
+        await self._send(msg, session)
 
+    async def send_batch(
+        self,
+        mail_type: MailTemplates,
+        recipients: Dict[str, Dict[str, str]],
+        session: aiohttp.ClientSession,
+    ) -> None:
+        """
+        Send the same template to several recipients in one request, through
+        Mailgun's batch sending. Every recipient's replacers need the same keys.
+        """
+        keys = next(iter(recipients.values())).keys()
         msg = {
             "from": "Sayonika <noreply@sayonika.moe>",
             "subject": getattr(MailSubjects, mail_type.value),
-            "to": [recipient],
-            "html": template,
+            "to": list(recipients),
+            # Mailgun fills these in per recipient, and keeps each one from seeing
+            # the others in `to`.
+            "html": await self._render(
+                mail_type, {k: f"%recipient.{k}%" for k in keys}
+            ),
+            "recipient-variables": json.dumps(recipients),
         }
 
-        async with session.post(
-            "https://api.mailgun.net/v3/sayonika.moe/messages",
-            auth=aiohttp.BasicAuth("api", self.mailgun_key),
-            data=msg,
-        ) as resp:
-            if resp.status == 200:
-                return True
-            raise EmailFailed
+        await self._send(msg, session)
@@ -0,0 +1,143 @@
+# Stdlib
+from typing import List, Optional
+
+# Sayonika Internals
+from framework.db import db
+
+__all__ = (
+    "backfill_ratings",
+    "check_ratings",
+    "backfill_reactions",
+    "backfill_variants",
+    "backfill_favorites",
+)
+
+# Rating aggregates computed from scratch, matching what the review trigger maintains.
+RATING_AGGREGATES = """
+    SELECT
+        m.id,
+        coalesce(sum(r.rating), 0) AS rating_sum,
+        count(r.rating) AS rating_count,
+        avg(r.rating) AS rating_avg,
+        ARRAY[{}]::int[] AS rating_histogram
+    FROM mod m
+    LEFT JOIN review r ON r.mod_id = m.id
+    GROUP BY m.id
+""".format(
+    ", ".join(
+        "count(*) FILTER (WHERE r.rating IS NOT NULL "
+        f"AND greatest(floor(r.rating)::int, 1) = {star})"
+        for star in range(1, 6)
+    )
+)
+MISMATCH = """
+    mod.rating_sum IS DISTINCT FROM agg.rating_sum
+    OR mod.rating_count IS DISTINCT FROM agg.rating_count
+    OR mod.rating_avg IS DISTINCT FROM agg.rating_avg
+    OR mod.rating_histogram IS DISTINCT FROM agg.rating_histogram
+"""
+
+
+async def backfill_ratings(mod_ids: Optional[List[str]] = None) -> int:
+    """Recomputes rating aggregates from reviews. Returns the amount of mods changed."""
+    only = "AND mod.id = ANY(:ids)" if mod_ids is not None else ""
+    status, _ = await db.status(
+        db.text(f"""
+            UPDATE mod SET
+                rating_sum = agg.rating_sum,
+                rating_count = agg.rating_count,
+                rating_avg = agg.rating_avg,
+                rating_histogram = agg.rating_histogram
+            FROM ({RATING_AGGREGATES}) agg
+            WHERE mod.id = agg.id
+            {only}
+            AND ({MISMATCH})
+            """),
+        **({"ids": mod_ids} if mod_ids is not None else {}),
+    )
+
+    return int(status.split()[-1])
+
+
+async def check_ratings() -> List[str]:
+    """Gets the IDs of mods whose stored rating aggregates don't match their reviews."""
+    rows = await db.all(db.text(f"""
+            SELECT mod.id FROM mod
+            JOIN ({RATING_AGGREGATES}) agg ON agg.id = mod.id
+            WHERE {MISMATCH}
+            """))
+
+    return [row[0] for row in rows]
+
+
+async def backfill_reactions() -> int:
+    """
+    Recomputes review reaction counters. Only needed if reactions were changed with
+    the trigger disabled. Returns the amount of reviews changed.
+    """
+    status, _ = await db.status(db.text("""
+            UPDATE review SET
+                upvote_count = agg.upvote_count,
+                downvote_count = agg.downvote_count,
+                funny_count = agg.funny_count,
+                score = agg.upvote_count - agg.downvote_count
+            FROM (
+                SELECT
+                    r.id,
+                    count(rr.id) FILTER (WHERE rr.reaction = 'upvote') AS upvote_count,
+                    count(rr.id) FILTER (WHERE rr.reaction = 'downvote')
+                        AS downvote_count,
+                    count(rr.id) FILTER (WHERE rr.reaction = 'funny') AS funny_count
+                FROM review r
+                LEFT JOIN review_reaction rr ON rr.review_id = r.id
+                GROUP BY r.id
+            ) agg
+            WHERE review.id = agg.id
+            AND (
+                review.upvote_count, review.downvote_count, review.funny_count
+            ) IS DISTINCT FROM (agg.upvote_count, agg.downvote_count, agg.funny_count)
+            """))
+
+    return int(status.split()[-1])
+
+
+async def backfill_favorites() -> int:
+    """
+    Recomputes favorite counts. Only needed if favorites were changed with the
+    trigger disabled. Returns the amount of mods changed.
+    """
+    status, _ = await db.status(db.text("""
+            UPDATE mod SET favorite_count = agg.favorite_count
+            FROM (
+                SELECT m.id, count(f.id) AS favorite_count
+                FROM mod m
+                LEFT JOIN user_favorite f ON f.mod_id = m.id
+                GROUP BY m.id
+            ) agg
+            WHERE mod.id = agg.id
+            AND mod.favorite_count IS DISTINCT FROM agg.favorite_count
+            """))
+
+    return int(status.split()[-1])
+
+
+async def backfill_variants(ingest_queue) -> int:
+    """
+    Queues generating the size variants of images uploaded before they existed, or
+    whose variants failed to generate. Returns the amount of images queued.
+    """
+    rows = await db.all(db.text("""
+            SELECT id, 'icon', icon, NULL FROM mod
+            WHERE icon IS NOT NULL AND icon_variants IS NULL
+            UNION ALL
+            SELECT id, 'banner', banner, NULL FROM mod
+            WHERE banner IS NOT NULL AND banner_variants IS NULL
+            UNION ALL
+            SELECT mod_id, 'media', hash, id FROM media
+            WHERE hash IS NOT NULL AND variants IS NULL
+            """))
+
+    for mod_id, field, hash_, media_id in rows:
+        await ingest_queue.enqueue_variants(mod_id, field, hash_, media_id)
+
+    return len(rows)
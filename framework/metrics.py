@@ -0,0 +1,247 @@
+"""
+Request metrics, shared by every worker through Redis and exposed in the Prometheus
+text format.
+"""
+
+# Stdlib
+import asyncio
+from collections import Counter, defaultdict
+import logging
+import time
+from typing import Any, Dict, Tuple, Optional
+from uuid import uuid4
+
+# External Libraries
+from aioredis import RedisError
+from quart import Quart, Response, g, request
+
+__all__ = ("Metrics",)
+
+logger = logging.getLogger("Sayonika")
+
+# Upper bounds, in seconds, of the request latency histogram buckets.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+FAMILIES = {
+    "sayonika_request_duration_seconds": (
+        "histogram",
+        "Time taken to respond to requests.",
+    ),
+    "sayonika_requests_total": ("counter", "Requests responded to, by status."),
+    "sayonika_request_bytes_total": ("counter", "Size of request bodies."),
+    "sayonika_response_bytes_total": ("counter", "Size of response bodies."),
+    "sayonika_requests_in_flight": ("gauge", "Requests currently being handled."),
+}
+
+
+def escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def series(name: str, **labels: Any) -> str:
+    """A series name with its labels, as it's written out."""
+    labels = ",".join(f'{k}="{escape(v)}"' for k, v in labels.items())
+
+    return f"{name}{{{labels}}}"
+
+
+def family(name: str) -> str:
+    for suffix in ("_bucket", "_sum", "_count"):
+        if name.endswith(suffix) and name[: -len(suffix)] in FAMILIES:
+            return name[: -len(suffix)]
+
+    return name
+
+
+class Metrics:
+    """
+    Per-route latency, status, payload size and in-flight metrics.
+    Each worker counts into memory and adds its counts to a Redis hash every
+    `flush_interval` seconds, so a scrape of any worker sees them all. In-flight
+    requests are kept per worker, and dropped along with workers that stop flushing.
+    """
+
+    key = "sayonika:metrics"
+    in_flight_format = "sayonika:metrics:in_flight:{}"
+
+    def __init__(self, redis, flush_interval: int = 10):
+        self.redis = redis
+        self.flush_interval = flush_interval
+        self.worker_id = uuid4().hex
+        self.pending = Counter()
+        self.in_flight = Counter()
+        self.task = None
+        self.flushes = 0
+        self.errors = 0
+
+    def init_app(self, app: Quart):
+        """Records every request to an app."""
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    @staticmethod
+    def _labels() -> Dict[str, str]:
+        # Requests matching no route are grouped, to not make a series per path.
+        return {"endpoint": request.endpoint or "none", "method": request.method}
+
+    async def _before_request(self):
+        g.metrics_labels = self._labels()
+        g.metrics_started = time.perf_counter()
+        self.in_flight[g.metrics_labels["endpoint"]] += 1
+
+    async def _after_request(self, response: Response) -> Response:
+        started = g.get("metrics_started")
+
+        if started is None:
+            return response
+
+        elapsed = time.perf_counter() - started
+        labels = g.metrics_labels
+        name = "sayonika_request_duration_seconds"
+
+        for bucket in LATENCY_BUCKETS:
+            if elapsed <= bucket:
+                self.pending[series(f"{name}_bucket", **labels, le=bucket)] += 1
+
+        self.pending[series(f"{name}_bucket", **labels, le="+Inf")] += 1
+        self.pending[series(f"{name}_sum", **labels)] += elapsed
+        self.pending[series(f"{name}_count", **labels)] += 1
+        self.pending[
+            series("sayonika_requests_total", **labels, status=response.status_code)
+        ] += 1
+        self.pending[series("sayonika_request_bytes_total", **labels)] += (
+            request.content_length or 0
+        )
+        self.pending[series("sayonika_response_bytes_total", **labels)] += (
+            response.content_length or 0
+        )
+
+        return response
+
+    async def _teardown_request(self, exc: Optional[BaseException]):
+        labels = g.get("metrics_labels")
+
+        if labels is not None:
+            self.in_flight[labels["endpoint"]] -= 1
+
+    async def flush(self):
+        """Adds this worker's counts since the last flush to Redis."""
+        pending, self.pending = self.pending, Counter()
+        in_flight_key = self.in_flight_format.format(self.worker_id)
+
+        transaction = self.redis.multi_exec()
+
+        for name, value in pending.items():
+            transaction.hincrbyfloat(self.key, name, value)
+
+        transaction.delete(in_flight_key)
+
+        for endpoint, count in self.in_flight.items():
+            if not count:
+                continue
+
+            transaction.hset(
+                in_flight_key,
+                series("sayonika_requests_in_flight", endpoint=endpoint),
+                count,
+            )
+
+        transaction.expire(in_flight_key, self.flush_interval * 3)
+
+        try:
+            await transaction.execute()
+        except (RedisError, OSError):
+            # Kept for the next flush.
+            self.pending.update(pending)
+            self.errors += 1
+            raise
+
+        self.flushes += 1
+
+    async def collect(self) -> Dict[str, float]:
+        """Gets the value of every series, across all workers."""
+        values: Dict[str, float] = {
+            k.decode(): float(v)
+            for k, v in (await self.redis.hgetall(self.key)).items()
+        }
+        in_flight: Dict[str, float] = defaultdict(float)
+
+        async for key in self.redis.iscan(match=self.in_flight_format.format("*")):
+            for name, value in (await self.redis.hgetall(key)).items():
+                in_flight[name.decode()] += float(value)
+
+        values.update(in_flight)
+
+        return values
+
+    async def render(self) -> str:
+        """All metrics in the Prometheus text format."""
+        try:
+            await self.flush()
+        except (RedisError, OSError):
+            logger.exception("Metrics flush failed")
+
+        families: Dict[str, list] = defaultdict(list)
+
+        for name, value in (await self.collect()).items():
+            families[family(name.split("{")[0])].append((name, value))
+
+        lines = []
+
+        for name, samples in sorted(families.items()):
+            type_, help_ = FAMILIES.get(name, ("untyped", ""))
+            lines += [f"# HELP {name} {help_}", f"# TYPE {name} {type_}"]
+            lines += [
+                f"{k} {int(v) if v.is_integer() else v}"
+                for k, v in sorted(samples, key=self._sort_key)
+            ]
+
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _sort_key(sample: Tuple[str, float]) -> Tuple[str, float]:
+        # Keeps histogram buckets in order of their bounds.
+        name, _ = sample
+        prefix, _, le = name.partition(',le="')
+
+        if not le:
+            return name, 0
+
+        le = le.split('"')[0]
+
+        return prefix, float("inf") if le == "+Inf" else float(le)
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+
+            try:
+                await self.flush()
+            except (RedisError, OSError):
+                logger.exception("Metrics flush failed")
+
+    def start(self):
+        """Starts flushing every `flush_interval` seconds."""
+        self.task = asyncio.ensure_future(self._flush_loop())
+
+    async def stop(self):
+        """Stops flushing, after a last flush so counts aren't lost."""
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+        try:
+            await self.flush()
+            await self.redis.delete(self.in_flight_format.format(self.worker_id))
+        except (RedisError, OSError):
+            logger.exception("Metrics flush failed")
+
+    def stats(self) -> Dict[str, Any]:
+        """Flush counters for this worker."""
+        return {
+            "pending_series": len(self.pending),
+            "in_flight": sum(self.in_flight.values()),
+            "flushes": self.flushes,
+            "errors": self.errors,
+        }
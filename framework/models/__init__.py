@@ -1,5 +1,7 @@
 from .base import Base
 from .connection import Connection
+from .content_hash import ContentHash
+from .download import DownloadFlush, ModDownloadStats
 from .editors_choice import EditorsChoice
 from .enums import (
     ModColor,
@@ -22,6 +24,8 @@ __all__ = (
     "AuthorRole",
     "Base",
     "Connection",
+    "ContentHash",
+    "DownloadFlush",
     "ModStatus",
     "ModCategory",
     "ModColor",
@@ -29,6 +33,7 @@ __all__ = (
     "MediaType",
     "Media",
     "Mod",
+    "ModDownloadStats",
     "Report",
     "Review",
     "ReviewDownvoters",
@@ -1,11 +1,11 @@
 # Stdlib
 from datetime import datetime
-from typing import List, Union
+from typing import Set, List, Union, Iterable
 
 # External Libraries
 from gino import Gino
 from simpleflake import simpleflake
-from sqlalchemy import or_, func
+from sqlalchemy import or_, and_, func
 
 # Sayonika Internals
 from framework.objects import db
@@ -16,6 +16,8 @@ class Base:
     Base class for models to inherit from.
     Provides default `id` column and `created_at` column, and utility class methods:
         `exists`: check if a row exists with given id
+        `exists_many`: get which of the given ids have no row, in a single query
+        `find_existing`: get which of the given values a column has, in a single query
         `get_any`: gets all rows matching at least one of the given arguments, being optionally case insensitive.
     """
 
@@ -27,6 +29,39 @@ class Base:
         """Check if a model exists with the given id."""
         return bool(await cls.select("id").where(cls.id == id_).gino.scalar())
 
+    @classmethod
+    async def exists_many(cls: db.Model, ids: Iterable[str]) -> Set[str]:
+        """Check which of the given ids don't have a model. Returns the missing ids."""
+        ids = set(ids)
+
+        return ids - await cls.find_existing("id", ids)
+
+    @classmethod
+    async def find_existing(
+        cls: db.Model, column: str, values: Iterable[str], **filters
+    ) -> Set[str]:
+        """
+        Get which of the given values are in a column, only counting rows that match
+        the given filters, e.g. `ModAuthor.find_existing("user_id", ids, mod_id=x)`.
+        """
+        values = set(values)
+
+        if not values:
+            return set()
+
+        rows = (
+            await cls.select(column)
+            .where(
+                and_(
+                    getattr(cls, column).in_(values),
+                    *[getattr(cls, k) == v for k, v in filters.items()],
+                )
+            )
+            .gino.all()
+        )
+
+        return {x[0] for x in rows}
+
     @classmethod
     def get_any(
         cls: db.Model, insensitive: Union[bool, List[str]] = False, **kwargs
@@ -0,0 +1,13 @@
+# Sayonika Internals
+from framework.objects import db
+
+from .base import Base
+
+
+class ContentHash(db.Model, Base):
+    __tablename__ = "content_hash"
+
+    sha256 = db.Column(db.Unicode(64), unique=True, nullable=False)
+    ipfs_hash = db.Column(db.Unicode(), index=True, nullable=False)
+    # Uploads using the content, see `ContentIndex`.
+    ref_count = db.Column(db.Integer(), server_default="1", nullable=False)
@@ -0,0 +1,22 @@
+# Sayonika Internals
+from framework.objects import db
+
+from .base import Base
+
+
+class ModDownloadStats(db.Model, Base):
+    __tablename__ = "mod_download_stats"
+    __table_args__ = (db.UniqueConstraint("mod_id", "bucket"),)
+
+    mod_id = db.Column(None, db.ForeignKey("mod.id", ondelete="CASCADE"))
+    # Start of the period the downloads happened in.
+    bucket = db.Column(db.DateTime(), nullable=False)
+    downloads = db.Column(db.BigInteger(), default=0)
+    # Approximate, counted by a HyperLogLog.
+    unique_downloads = db.Column(db.BigInteger(), default=0)
+
+
+class DownloadFlush(db.Model, Base):
+    """Download counts already written from Redis, so they're never written twice."""
+
+    __tablename__ = "download_flush"
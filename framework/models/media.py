@@ -1,3 +1,9 @@
+# Stdlib
+from typing import Optional
+
+# External Libraries
+from sqlalchemy.dialects.postgresql import JSONB
+
 # Sayonika Internals
 from framework.objects import db
 
@@ -10,4 +16,15 @@ class Media(db.Model, Base):
 
     type = db.Column(db.Enum(MediaType))
     hash = db.Column(db.Unicode())
+    # Hashes of the resized versions of the image, keyed by variant name.
+    variants = db.Column(JSONB(), nullable=True)
     mod_id = db.Column(None, db.ForeignKey("mod.id", ondelete="CASCADE"))
+
+    def to_dict(self, variant: Optional[str] = None):
+        """`variant` swaps the image for one of its size variants, if it has it."""
+        data = super().to_dict()
+
+        if variant is not None:
+            data["hash"] = (data["variants"] or {}).get(variant, data["hash"])
+
+        return data
@@ -1,9 +1,12 @@
 # Stdlib
 from datetime import datetime
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 
 # External Libraries
+from sqlalchemy import or_, func
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, TSVECTOR
 from sqlalchemy.engine.default import DefaultExecutionContext
+from sqlalchemy.sql.elements import ColumnElement
 
 # Sayonika Internals
 from framework.objects import db
@@ -22,6 +25,10 @@ def create_generalized_title(context: DefaultExecutionContext) -> str:
     return generalize_text(params["title"])
 
 
+def to_tsquery(q: str) -> ColumnElement:
+    return func.plainto_tsquery("english", q)
+
+
 class Mod(db.Model, Base):
     __tablename__ = "mod"
 
@@ -31,6 +38,9 @@ class Mod(db.Model, Base):
     )
     icon = db.Column(db.Unicode())
     banner = db.Column(db.Unicode())
+    # Hashes of the resized versions of `icon` and `banner`, keyed by variant name.
+    icon_variants = db.Column(JSONB(), nullable=True)
+    banner_variants = db.Column(JSONB(), nullable=True)
     tagline = db.Column(db.Unicode(100))
     description = db.Column(db.Unicode(10000))
     website = db.Column(db.Unicode())
@@ -43,10 +53,20 @@ class Mod(db.Model, Base):
         db.DateTime(), default=datetime.utcnow, onupdate=datetime.utcnow
     )
     status = db.Column(db.Enum(ModStatus))
-    # TODO: probably turn this into a table and have better metrics for determining DLs
+    # Written in batches by `DownloadCounter`, per period stats are in ModDownloadStats.
     downloads = db.Column(db.BigInteger(), default=0)
     download_url = db.Column(db.Unicode(), nullable=True)
     verified = db.Column(db.Boolean(), default=False)
+    # Weighted title, tagline and description. Kept up to date by a trigger.
+    search_vector = db.Column(TSVECTOR())
+    # Rating aggregates over the mod's reviews. Kept up to date by a trigger on review.
+    rating_sum = db.Column(db.Numeric(), default=0)
+    rating_count = db.Column(db.Integer(), default=0)
+    rating_avg = db.Column(db.Numeric(), nullable=True)
+    # Review counts per star, where 1 star also covers half star ratings.
+    rating_histogram = db.Column(ARRAY(db.Integer()), default=lambda: [0] * 5)
+    # Kept up to date by a trigger on user_favorite.
+    favorite_count = db.Column(db.Integer(), default=0)
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -82,18 +102,48 @@ class Mod(db.Model, Base):
     def media(self, value: "Media"):
         self._media.append(value)
 
-    def to_dict(self):
-        return {
+    @classmethod
+    def search_filter(cls, q: str) -> ColumnElement:
+        """Matches mods against a search, either through full text or fuzzy titles."""
+        return or_(cls.search_vector.op("@@")(to_tsquery(q)), cls.title.op("%")(q))
+
+    @classmethod
+    def search_rank(cls, q: str) -> ColumnElement:
+        """How relevant a mod is to a search, for ordering results."""
+        return func.ts_rank(cls.search_vector, to_tsquery(q)) + func.similarity(
+            cls.title, q
+        )
+
+    def to_dict(self, variant: Optional[str] = None):
+        """
+        `variant` swaps images for one of their size variants, keeping the full size
+        images for any that don't have their variants generated yet.
+        """
+        data = {
             **{
                 k: v
                 for k, v in super().to_dict().items()
-                if k not in ("generalized_title",)
+                if k not in ("generalized_title", "search_vector", "rating_sum")
             },
             "authors": self._authors,
             "owner": self._owner,
             "media": self._media,
         }
 
+        # Numeric columns come back as `Decimal`, which JSON can't encode.
+        if data["rating_avg"] is not None:
+            data["rating_avg"] = float(data["rating_avg"])
+
+        if variant is not None:
+            for field in ("icon", "banner"):
+                data[field] = (data[f"{field}_variants"] or {}).get(
+                    variant, data[field]
+                )
+
+            data["media"] = [x.to_dict(variant) for x in self._media]
+
+        return data
+
 
 class ModAuthor(db.Model, Base):
     __tablename__ = "user_mod"
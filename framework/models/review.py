@@ -1,9 +1,15 @@
+# Stdlib
+from typing import TYPE_CHECKING, Set
+
 # Sayonika Internals
 from framework.objects import db
 
 from .base import Base
 from .enums import ReactionType
 
+if TYPE_CHECKING:
+    from .user import User
+
 
 class Review(db.Model, Base):
     __tablename__ = "review"
@@ -14,45 +20,52 @@ class Review(db.Model, Base):
     mod_id = db.Column(None, db.ForeignKey("mod.id", ondelete="CASCADE"))
     author_id = db.Column(None, db.ForeignKey("user.id", ondelete="CASCADE"))
 
+    # Reaction counters, kept up to date by a trigger on review_reaction.
+    upvote_count = db.Column(db.Integer(), default=0)
+    downvote_count = db.Column(db.Integer(), default=0)
+    funny_count = db.Column(db.Integer(), default=0)
+    # Upvotes minus downvotes, for sorting by best.
+    score = db.Column(db.Integer(), default=0)
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
-        self._upvotes = []
-        self._downvotes = []
-        self._funnys = []
+        self._author = None
+        self._user_reactions = None
 
     @property
-    def upvotes(self):
-        return self._upvotes
+    def author(self):
+        return self._author
 
-    @property
-    def downvotes(self):
-        return self._downvotes
+    @author.setter
+    def author(self, value: "User"):
+        self._author = value
 
     @property
-    def funnys(self):
-        return self._funnys
-
-    @upvotes.setter
-    def upvotes(self, value: "ReviewReaction"):
-        self._upvotes.append(value)
+    def user_reactions(self):
+        return self._user_reactions
 
-    @downvotes.setter
-    def downvotes(self, value: "ReviewReaction"):
-        self._downvotes.append(value)
-
-    @funnys.setter
-    def funnys(self, value: "ReviewReaction"):
-        self._funnys.append(value)
+    @user_reactions.setter
+    def user_reactions(self, value: Set[ReactionType]):
+        self._user_reactions = value
 
     def to_dict(self):
-        return {
-            **{k: v for k, v in super().to_dict},
-            "upvotes": self._upvotes,
-            "downvotes": self._downvotes,
-            "funnys": self._funnys,
+        data = {
+            **super().to_dict(),
+            "author": self._author.to_dict() if self._author is not None else None,
         }
 
+        # Numeric columns come back as `Decimal`, which JSON can't encode.
+        if data["rating"] is not None:
+            data["rating"] = float(data["rating"])
+
+        if self._user_reactions is not None:
+            data["user_reactions"] = {
+                type_.name: type_ in self._user_reactions for type_ in ReactionType
+            }
+
+        return data
+
 
 class ReviewReaction(db.Model, Base):
     __tablename__ = "review_reaction"
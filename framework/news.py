@@ -0,0 +1,294 @@
+# Stdlib
+import asyncio
+from base64 import b64encode as b64
+import json
+import logging
+import random
+import time
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+
+# External Libraries
+import aiohttp
+from aioredis import RedisError
+from bs4 import BeautifulSoup
+from cachetools import TTLCache
+import mmh3
+from sqlalchemy import and_
+
+# Sayonika Internals
+import framework.models
+
+__all__ = ("NewsFeed",)
+
+logger = logging.getLogger("Sayonika")
+
+# Only drops the lock if it's still the one this worker took, as it may have expired.
+UNLOCK_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+
+def news_id(string: str) -> str:
+    return b64(str(mmh3.hash(string)).encode("utf8")).decode("utf8")
+
+
+def parse_medium_feed(feed: str) -> dict:
+    """Gets the latest post from a Medium RSS feed."""
+    soup = BeautifulSoup(feed, "xml")
+    post = soup.item
+    content = BeautifulSoup(post("content:encoded")[0].string, "html.parser")
+
+    return {
+        "type": 2,
+        "title": post.title.string,
+        "body": content.p.string,  # First paragraph is the subtitle thing
+        "url": post.guid.string,
+        "banner": content.img["src"].replace(
+            "max/1024", "max/2048"
+        ),  # First image is the banner
+        "id": news_id(post.guid.string),
+    }
+
+
+class NewsFeed:
+    """
+    News for the front page, built in the background and shared by every worker
+    through Redis, so requests never wait on Medium.
+    Only one worker refreshes at a time. When Medium can't be reached, the last blog
+    post is kept, and news is served however stale it is until a refresh succeeds.
+    """
+
+    key = "sayonika:news"
+    lock_key = "sayonika:news:lock"
+
+    def __init__(
+        self,
+        redis,
+        publication: str,
+        refresh_interval: int = 15 * 60,
+        timeout: float = 10,
+        lock_ttl: int = 60,
+        local_ttl: int = 30,
+    ):
+        self.redis = redis
+        self.publication = publication
+        self.refresh_interval = refresh_interval
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.lock_ttl = lock_ttl
+        self.local = TTLCache(1, local_ttl)
+        self.refreshing: Optional[asyncio.Future] = None
+        self.task = None
+        self.refreshes = 0
+        self.failures = 0
+        self.last_refresh = None
+
+    async def get(self, session: aiohttp.ClientSession) -> List[dict]:
+        """Gets the current news, only building it if there's none at all yet."""
+        news = self.local.get("news")
+
+        if news is not None:
+            return news
+
+        stored = await self._load()
+
+        if stored is None:
+            # Nothing has been built yet. Refreshing caches the news itself if it can.
+            return await self.refresh(session)
+
+        self.local["news"] = stored["news"]
+
+        return stored["news"]
+
+    async def refresh(self, session: aiohttp.ClientSession) -> List[dict]:
+        """Rebuilds the news. Concurrent calls in a worker share the same rebuild."""
+        if self.refreshing is None:
+            self.refreshing = asyncio.ensure_future(self._refresh(session))
+            self.refreshing.add_done_callback(self._refreshed)
+
+        return await asyncio.shield(self.refreshing)
+
+    def _refreshed(self, _):
+        self.refreshing = None
+
+    async def _load(self) -> Optional[Dict[str, Any]]:
+        try:
+            data = await self.redis.get(self.key)
+        except (RedisError, OSError):
+            return None
+
+        return json.loads(data) if data is not None else None
+
+    async def _lock(self) -> Optional[str]:
+        """Takes the refresh lock, returning a token to release it with, or None."""
+        token = uuid4().hex
+
+        try:
+            locked = await self.redis.set(
+                self.lock_key,
+                token,
+                expire=self.lock_ttl,
+                exist=self.redis.SET_IF_NOT_EXIST,
+            )
+        except (RedisError, OSError):
+            return token
+
+        return token if locked else None
+
+    async def _unlock(self, token: str):
+        try:
+            await self.redis.eval(UNLOCK_SCRIPT, keys=[self.lock_key], args=[token])
+        except (RedisError, OSError):
+            pass
+
+    async def _refresh(self, session: aiohttp.ClientSession) -> List[dict]:
+        previous = await self._load()
+        token = await self._lock()
+
+        if token is None:
+            # Another worker is refreshing, so whatever news there is will do for now.
+            return previous["news"] if previous is not None else []
+
+        try:
+            news = await self._build(previous, session)
+        finally:
+            await self._unlock(token)
+
+        self.local["news"] = news
+        self.refreshes += 1
+        self.last_refresh = time.time()
+
+        return news
+
+    async def _build(
+        self, previous: Optional[Dict[str, Any]], session: aiohttp.ClientSession
+    ) -> List[dict]:
+        try:
+            blog = await self._fetch_blog(session)
+        except (
+            aiohttp.ClientError,
+            asyncio.TimeoutError,
+            AttributeError,
+            IndexError,
+            TypeError,
+        ):
+            # Either Medium couldn't be reached, or the post isn't shaped as expected.
+            logger.exception("Couldn't fetch the Medium feed")
+            self.failures += 1
+            blog = previous["blog"] if previous is not None else None
+
+        news = [await self._recent_mod(), await self._featured_mod(), blog]
+        # Featured and recent may be None if there are no EditorsChoices or Mods.
+        news = [x for x in news if x is not None]
+
+        try:
+            await self.redis.set(
+                self.key,
+                json.dumps({"news": news, "blog": blog, "refreshed_at": time.time()}),
+            )
+        except (RedisError, OSError):
+            pass
+
+        return news
+
+    async def _fetch_blog(self, session: aiohttp.ClientSession) -> dict:
+        async with session.get(
+            f"https://medium.com/feed/{self.publication}", timeout=self.timeout
+        ) as resp:
+            feed = await resp.text()
+
+        # Parsing the feed takes long enough to be worth keeping off of the loop.
+        return await asyncio.get_event_loop().run_in_executor(
+            None, parse_medium_feed, feed
+        )
+
+    @staticmethod
+    async def _recent_mod() -> Optional[dict]:
+        Mod, ModStatus = framework.models.Mod, framework.models.ModStatus
+        # Picks from the latest releases, which only needs the top of an index.
+        mods = (
+            await Mod.query.where(
+                and_(
+                    Mod.verified,
+                    Mod.status == ModStatus.released,
+                    Mod.released_at.isnot(None),
+                )
+            )
+            .order_by(Mod.released_at.desc())
+            .limit(10)
+            .gino.all()
+        )
+
+        if not mods:
+            return None
+
+        mod = random.choice(mods)
+
+        return {
+            "type": 0,
+            "title": mod.title,
+            "body": mod.tagline,
+            "url": f"/mods/{mod.id}",
+            "banner": mod.banner,
+            "id": news_id(mod.id),
+        }
+
+    @staticmethod
+    async def _featured_mod() -> Optional[dict]:
+        Mod, EditorsChoice = framework.models.Mod, framework.models.EditorsChoice
+        featured = (
+            await EditorsChoice.load(mod=Mod)
+            .where(EditorsChoice.featured)
+            .order_by(EditorsChoice.created_at.desc())
+            .gino.first()
+        )
+
+        if featured is None:
+            return None
+
+        return {
+            "type": 1,
+            "title": featured.mod.title,
+            "body": featured.editors_notes,
+            "url": featured.article_url,
+            "banner": featured.mod.banner,
+            "id": news_id(featured.mod.id),
+        }
+
+    async def _refresh_loop(self, session: aiohttp.ClientSession):
+        while True:
+            try:
+                stored = await self._load()
+
+                # Every worker runs this loop, so most find news another just built.
+                if (
+                    stored is None
+                    or time.time() - stored["refreshed_at"] > self.refresh_interval / 2
+                ):
+                    await self.refresh(session)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("News refresh failed")
+
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self, session: aiohttp.ClientSession):
+        """Starts refreshing every `refresh_interval` seconds."""
+        self.task = asyncio.ensure_future(self._refresh_loop(session))
+
+    async def stop(self):
+        """Stops refreshing."""
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Refresh counters for this worker."""
+        return {
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "last_refresh": self.last_refresh,
+        }
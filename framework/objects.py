@@ -3,19 +3,31 @@ import asyncio
 import logging
 
 # External Libraries
-import quart.flask_patch  # noqa: F401 pylint: disable=unused-import
 from aioredis import ConnectionsPool
-from flask_limiter import Limiter
 from quart_cors import cors
 
 # Sayonika Internals
+from framework.content_index import ContentIndex
 from framework.db import db
+from framework.downloads import DownloadCounter
+from framework.hashing import HashingPool
+from framework.ingest import IngestQueue
 from framework.init_later_redis import InitLaterRedis
-from framework.limiter import get_ratelimit_key
+from framework.ipfs import IPFSClient
+from framework.limiter import RateLimiter, get_ratelimit_key
+from framework.mail_outbox import MailOutbox
 from framework.mailer import Mailer
+from framework.metrics import Metrics
+from framework.news import NewsFeed
+from framework.query_stats import QueryMonitor
+from framework.response_cache import ResponseCache
 from framework.sayonika import Sayonika
 from framework.settings import SETTINGS
+from framework.thumbnails import ThumbnailPool
+from framework.token_cache import TokenCache
 from framework.tokens import JWT
+from framework.totals import TotalCounter
+from framework.trending import TrendingTracker
 
 __all__ = (
     "sayonika_instance",
@@ -24,8 +36,22 @@ __all__ = (
     "jwt_service",
     "db",
     "mailer",
+    "mail_outbox",
     "loop",
     "redis",
+    "token_cache",
+    "hashing_pool",
+    "total_counter",
+    "response_cache",
+    "content_index",
+    "ipfs",
+    "thumbnail_pool",
+    "ingest_queue",
+    "trending",
+    "download_counter",
+    "news_feed",
+    "metrics",
+    "query_monitor",
 )
 
 loop = asyncio.get_event_loop()
@@ -35,19 +61,55 @@ sayonika_instance = cors(
     Sayonika(),
     allow_origin=["https://sayonika.moe", "*"],  # Remove this one when ready for prod
 )
-jwt_service = JWT(SETTINGS)
-mailer = Mailer(SETTINGS)
-limiter = Limiter(
-    key_func=get_ratelimit_key,
-    default_limits=SETTINGS.get("RATELIMITS", "5 per 2 seconds;1000 per hour").split(
-        ";"
-    ),
-)
 redis = InitLaterRedis(
     ConnectionsPool(SETTINGS["REDIS_URL"], minsize=5, maxsize=10, loop=loop)
 )
+token_cache = TokenCache(redis)
+total_counter = TotalCounter(redis)
+response_cache = ResponseCache(redis)
+jwt_service = JWT(SETTINGS, token_cache)
+mailer = Mailer(SETTINGS)
+mail_outbox = MailOutbox(redis, mailer, int(SETTINGS["MAIL_WORKERS"]))
+hashing_pool = HashingPool(
+    int(SETTINGS["HASH_WORKERS"]), int(SETTINGS["HASH_QUEUE_SIZE"])
+)
+content_index = ContentIndex()
+ipfs = IPFSClient(
+    SETTINGS["IPFS_API"],
+    int(SETTINGS["IPFS_CONCURRENCY"]),
+    int(SETTINGS["IPFS_REQUEST_CONCURRENCY"]),
+    float(SETTINGS["IPFS_TIMEOUT"]),
+    int(SETTINGS["IPFS_RETRIES"]),
+    content_index,
+)
+thumbnail_pool = ThumbnailPool(int(SETTINGS["THUMBNAIL_WORKERS"]))
+ingest_queue = IngestQueue(
+    redis, ipfs, thumbnail_pool, response_cache, int(SETTINGS["INGEST_WORKERS"])
+)
+trending = TrendingTracker(
+    redis, int(SETTINGS["TRENDING_HALF_LIFE"]), int(SETTINGS["TRENDING_INTERVAL"])
+)
+download_counter = DownloadCounter(
+    redis,
+    int(SETTINGS["DOWNLOAD_BUCKET_SIZE"]),
+    int(SETTINGS["DOWNLOAD_FLUSH_INTERVAL"]),
+    trending=trending,
+)
+news_feed = NewsFeed(
+    redis, SETTINGS["MEDIUM_PUBLICATION"], int(SETTINGS["NEWS_REFRESH_INTERVAL"])
+)
+metrics = Metrics(redis, int(SETTINGS["METRICS_FLUSH_INTERVAL"]))
+query_monitor = QueryMonitor()
+limiter = RateLimiter(
+    redis,
+    get_ratelimit_key,
+    SETTINGS.get("RATELIMITS", "5 per 2 seconds;1000 per hour"),
+)
 
 # Use env vars to update config
 sayonika_instance.config.update(SETTINGS)
+# Before the limiter, so rate limited requests are measured too.
+metrics.init_app(sayonika_instance)
+query_monitor.init_app(sayonika_instance)
 limiter.init_app(sayonika_instance)
 logger.setLevel(logging.INFO)
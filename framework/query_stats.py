@@ -0,0 +1,109 @@
+# Stdlib
+from functools import wraps
+import logging
+from typing import Any, Dict
+
+# External Libraries
+from quart import Quart, Response, request, current_app
+
+# Sayonika Internals
+from framework.db import QueryStats, current_queries
+
+__all__ = ("QueryBudgetExceeded", "QueryMonitor", "query_budget")
+
+logger = logging.getLogger("Sayonika")
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when testing for requests running more queries than their route allows."""
+
+    def __init__(self, stats: QueryStats):
+        super().__init__(
+            f"{stats.route} ran {stats.count} queries, over its budget of "
+            f"{stats.budget}. Slowest: {stats.slowest}"
+        )
+
+
+def query_budget(limit: int):
+    """
+    Decorator declaring the most queries a route should run. Going over it fails the
+    request when the app is testing, and is logged otherwise. Goes below `route`.
+    """
+
+    def decorator(func):
+        @wraps(func)
+        async def inner(*args, **kwargs):
+            stats = current_queries.get()
+
+            if stats is None:
+                return await func(*args, **kwargs)
+
+            stats.budget = limit
+            response = await func(*args, **kwargs)
+
+            if stats.count > limit:
+                if current_app.testing:
+                    raise QueryBudgetExceeded(stats)
+
+                logger.warning(str(QueryBudgetExceeded(stats)))
+
+            return response
+
+        return inner
+
+    return decorator
+
+
+class QueryMonitor:
+    """
+    Counts the queries of every request, adding a `Server-Timing` header with their
+    count and time in debug mode.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.counters = {"requests": 0, "queries": 0, "over_budget": 0}
+        self.time = 0.0
+
+    def init_app(self, app: Quart):
+        self.app = app
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+    @staticmethod
+    async def _before_request():
+        current_queries.set(QueryStats(request.endpoint or "none"))
+
+    async def _after_request(self, response: Response) -> Response:
+        stats = current_queries.get()
+
+        if stats is None:
+            return response
+
+        self.counters["requests"] += 1
+        self.counters["queries"] += stats.count
+        self.time += stats.time
+
+        if self.app.debug:
+            response.headers.add(
+                "Server-Timing",
+                f'db;dur={stats.time * 1000:.1f};desc="{stats.count} queries", '
+                f"db-slowest;dur={stats.slowest_time * 1000:.1f}",
+            )
+
+        if stats.budget is not None and stats.count > stats.budget:
+            self.counters["over_budget"] += 1
+
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        """Query counters for this worker."""
+        requests = self.counters["requests"]
+
+        return {
+            **self.counters,
+            "time": self.time,
+            "queries_per_request": (
+                self.counters["queries"] / requests if requests else None
+            ),
+        }
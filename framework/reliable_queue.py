@@ -0,0 +1,135 @@
+# Stdlib
+import asyncio
+import logging
+from typing import List
+from uuid import uuid4
+
+# External Libraries
+import aiohttp
+from aioredis import RedisError
+
+__all__ = ("ReliableQueue",)
+
+logger = logging.getLogger("Sayonika")
+
+
+class ReliableQueue:
+    """
+    Base of job queues kept in Redis, so any worker process can pick jobs up.
+    Each worker takes up to `batch_size` jobs at a time, moving them to a per-worker
+    processing list until they've been handled. Jobs left in the list because handling
+    them failed are put back on the queue, as are the lists of workers that stopped
+    sending heartbeats, so neither an error nor a crash loses them.
+    Subclasses set the keys and `name`, and implement `_handle`.
+    """
+
+    name: str
+    queue_key: str
+    processing_format: str
+    heartbeat_format: str
+    batch_size = 1
+
+    def __init__(self, redis, workers: int, heartbeat_ttl: int):
+        self.redis = redis
+        self.workers = workers
+        self.heartbeat_ttl = heartbeat_ttl
+        self.worker_id = uuid4().hex
+        self.tasks: List[asyncio.Task] = []
+
+    def start(self, session: aiohttp.ClientSession):
+        """Starts this process' workers."""
+        self.tasks = [asyncio.ensure_future(self._heartbeat())] + [
+            asyncio.ensure_future(self._work(i, session)) for i in range(self.workers)
+        ]
+
+    async def stop(self):
+        """Stops this process' workers. Unfinished jobs get picked up again later."""
+        for task in self.tasks:
+            task.cancel()
+
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    async def _heartbeat(self):
+        while True:
+            try:
+                await self.redis.set(
+                    self.heartbeat_format.format(self.worker_id),
+                    1,
+                    expire=self.heartbeat_ttl,
+                )
+                await self._requeue_orphans()
+                await self._on_heartbeat()
+            except (RedisError, OSError):
+                logger.exception(f"{self.name.capitalize()} heartbeat failed")
+
+            await asyncio.sleep(self.heartbeat_ttl / 3)
+
+    async def _on_heartbeat(self):
+        """Runs on every heartbeat, for upkeep of the queue."""
+
+    async def _requeue_orphans(self):
+        async for key in self.redis.iscan(
+            match=self.processing_format.format("*", "*")
+        ):
+            worker_id = key.decode().split(":")[-2]
+
+            if not await self.redis.exists(self.heartbeat_format.format(worker_id)):
+                await self._requeue(key)
+
+    async def _requeue(self, processing_key: str):
+        while await self.redis.rpoplpush(processing_key, self.queue_key) is not None:
+            pass
+
+    async def _work(self, index: int, session: aiohttp.ClientSession):
+        processing_key = self.processing_format.format(self.worker_id, index)
+
+        while True:
+            try:
+                # Jobs left over from a batch that couldn't be handled go back on the
+                # queue, at the risk of handling some of them twice.
+                await self._requeue(processing_key)
+                batch = await self._fetch(processing_key)
+            except (RedisError, OSError):
+                logger.exception(f"Couldn't fetch {self.name} jobs")
+                await asyncio.sleep(5)
+                continue
+
+            if not batch:
+                continue
+
+            try:
+                await self._handle(batch, session)
+            except Exception:  # pylint: disable=broad-except
+                # Kept in the processing list, to be put back on the queue.
+                logger.exception(f"Handling {self.name} jobs failed")
+                await asyncio.sleep(5)
+                continue
+
+            try:
+                # Only this worker uses the list, and everything in it has been handled.
+                await self.redis.delete(processing_key)
+            except (RedisError, OSError):
+                logger.exception(f"Couldn't clear handled {self.name} jobs")
+
+    async def _fetch(self, processing_key: str) -> List[bytes]:
+        raw = await self.redis.brpoplpush(self.queue_key, processing_key, timeout=5)
+
+        if raw is None:
+            return []
+
+        batch = [raw]
+
+        while len(batch) < self.batch_size:
+            raw = await self.redis.rpoplpush(self.queue_key, processing_key)
+
+            if raw is None:
+                break
+
+            batch.append(raw)
+
+        return batch
+
+    async def _handle(self, batch: List[bytes], session: aiohttp.ClientSession):
+        """Handles jobs taken off the queue. Raising puts them all back on it."""
+        raise NotImplementedError
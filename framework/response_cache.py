@@ -0,0 +1,165 @@
+# Stdlib
+from collections import Counter, defaultdict
+import json
+import time
+from typing import Any, Dict, Optional, NamedTuple
+
+# External Libraries
+from aioredis import RedisError
+from cachetools import TTLCache
+
+__all__ = ("CachedResponse", "ResponseCache")
+
+
+class CachedResponse(NamedTuple):
+    """A response body stored by `ResponseCache`."""
+
+    body: str
+    status: int
+    content_type: str
+    generation: int
+    fresh_until: float
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.fresh_until
+
+
+class ResponseCache:
+    """
+    Caches whole responses in Redis, with a small in-process tier in front.
+    Entries are grouped into namespaces that are invalidated together by bumping their
+    generation, so anything changing data shown by a cached route must call
+    `invalidate`. Other workers may still serve their local copy for up to `local_ttl`
+    seconds. Entries are kept for `stale_ttl` seconds past expiry, so that they can be
+    served while a single request refreshes them.
+    """
+
+    key_format = "sayonika:response:{}:{}"
+    generation_format = "sayonika:response_generation:{}"
+    lock_format = "sayonika:response_lock:{}:{}"
+
+    def __init__(
+        self,
+        redis,
+        ttl: int = 30,
+        stale_ttl: int = 300,
+        lock_ttl: int = 10,
+        local_ttl: int = 2,
+        local_size: int = 512,
+    ):
+        self.redis = redis
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.lock_ttl = lock_ttl
+        self.local = TTLCache(local_size, local_ttl)
+        self.counters = defaultdict(Counter)
+
+    async def get(self, namespace: str, path: str) -> Optional[CachedResponse]:
+        """Gets the cached response for a path, which may be stale."""
+        entry = self.local.get((namespace, path))
+
+        if entry is not None and entry.fresh:
+            return entry
+
+        try:
+            generation, data = await self.redis.mget(
+                self.generation_format.format(namespace),
+                self.key_format.format(namespace, path),
+            )
+        except (RedisError, OSError):
+            return None
+
+        if data is None:
+            return None
+
+        entry = CachedResponse(**json.loads(data))
+
+        # Entries from before the last invalidation are never served, not even stale.
+        if entry.generation != int(generation or 0):
+            return None
+
+        if entry.fresh:
+            self.local[(namespace, path)] = entry
+
+        return entry
+
+    async def generation(self, namespace: str) -> Optional[int]:
+        """Gets the current generation of a namespace, or None if Redis is down."""
+        try:
+            generation = await self.redis.get(self.generation_format.format(namespace))
+        except (RedisError, OSError):
+            return None
+
+        return int(generation or 0)
+
+    async def set(
+        self,
+        namespace: str,
+        path: str,
+        generation: int,
+        body: str,
+        status: int,
+        content_type: str,
+    ):
+        """
+        Stores a response for a path and releases its refresh lock. `generation` should
+        be fetched before building the response, so that one built from data changed
+        in the meantime is dropped as soon as it's stored.
+        """
+        entry = CachedResponse(
+            body, status, content_type, generation, time.time() + self.ttl
+        )
+
+        try:
+            await self.redis.set(
+                self.key_format.format(namespace, path),
+                json.dumps(entry._asdict()),
+                expire=self.ttl + self.stale_ttl,
+            )
+            await self.redis.delete(self.lock_format.format(namespace, path))
+        except (RedisError, OSError):
+            return
+
+        self.local[(namespace, path)] = entry
+
+    async def lock(self, namespace: str, path: str) -> bool:
+        """Claims refreshing a stale path. Only one caller gets True until it's set."""
+        try:
+            return await self.redis.set(
+                self.lock_format.format(namespace, path),
+                1,
+                expire=self.lock_ttl,
+                exist=self.redis.SET_IF_NOT_EXIST,
+            )
+        except (RedisError, OSError):
+            return True
+
+    async def invalidate(self, namespace: str):
+        """Drops every cached response in a namespace."""
+        for key in [key for key in self.local if key[0] == namespace]:
+            self.local.pop(key, None)
+
+        try:
+            await self.redis.incr(self.generation_format.format(namespace))
+        except (RedisError, OSError):
+            pass
+
+    def record(self, route: str, outcome: str):
+        """Counts a `hit`, `stale` hit or `miss` for a route."""
+        self.counters[route][outcome] += 1
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Hit and miss counters per route for this worker."""
+        stats = {}
+
+        for route, counter in self.counters.items():
+            total = sum(counter.values())
+            stats[route] = {
+                "hits": counter["hit"],
+                "stale_hits": counter["stale"],
+                "misses": counter["miss"],
+                "hit_ratio": (counter["hit"] + counter["stale"]) / total,
+            }
+
+        return stats
@@ -1,48 +1,107 @@
 # Stdlib
 from functools import wraps
 import json as _json
+from urllib.parse import urlencode
 
 # External Libraries
 from quart import Response, abort, request
 
 # Sayonika Internals
 from framework.authentication import Authenticator
+from framework.identity import get_request_token
+from framework.jsonutils import dumps
+from framework.objects import response_cache
 
-__all__ = ("json", "requires_login", "requires_admin")
+__all__ = ("json", "cached", "requires_login", "requires_admin")
 
 
 def json(func):
-    """Wraps a route to return a preformatted JSON format with other response details."""
+    """
+    Wraps a route to return a preformatted JSON format with other response details.
+    Routes return the plain data for `result`, which is serialized once here. Responses
+    are still accepted for routes that need to set their own status or headers.
+    """
 
     @wraps(func)
     async def inner(*args, **kwargs):
         response = await func(*args, **kwargs)
-        text = await response.get_data(False)
-
-        try:
-            data = _json.loads(text)
-        except _json.JSONDecodeError:
-            data = text
-
-        result = _json.dumps(
-            {
-                "result": data,
-                "status": response.status_code,
-                "success": response.status_code < 400,
-            },
-            indent=4 if request.args.get("pretty") == "true" else None,
+
+        if isinstance(response, Response):
+            status, headers = response.status_code, response.headers
+            text = await response.get_data(False)
+
+            try:
+                data = _json.loads(text)
+            except _json.JSONDecodeError:
+                data = text
+        else:
+            data, status, headers = response, 200, None
+
+        result = dumps(
+            {"result": data, "status": status, "success": status < 400},
+            pretty=request.args.get("pretty") == "true",
         )
 
         return Response(
             response=result,
-            headers=response.headers,
-            status=response.status_code,
+            headers=headers,
+            status=status,
             content_type="application/json",
         )
 
     return inner
 
 
+def cached(namespace: str):
+    """
+    Caches a route's response for anonymous GET requests, keyed by path and query.
+    Goes between `route` and `json`. Anything changing what the route returns should
+    invalidate `namespace` on `response_cache`.
+    """
+
+    def decorator(func):
+        @wraps(func)
+        async def inner(*args, **kwargs):
+            if request.method != "GET" or get_request_token() is not None:
+                return await func(*args, **kwargs)
+
+            rule = request.url_rule.rule
+            path = f"{request.path}?{urlencode(sorted(request.args.items(multi=True)))}"
+            entry = await response_cache.get(namespace, path)
+
+            # Stale entries keep being served while one request refreshes them.
+            if entry is not None and (
+                entry.fresh or not await response_cache.lock(namespace, path)
+            ):
+                response_cache.record(rule, "hit" if entry.fresh else "stale")
+
+                return Response(
+                    response=entry.body,
+                    status=entry.status,
+                    content_type=entry.content_type,
+                )
+
+            response_cache.record(rule, "miss")
+            generation = await response_cache.generation(namespace)
+            response = await func(*args, **kwargs)
+
+            if response.status_code == 200 and generation is not None:
+                await response_cache.set(
+                    namespace,
+                    path,
+                    generation,
+                    await response.get_data(False),
+                    response.status_code,
+                    response.content_type,
+                )
+
+            return response
+
+        return inner
+
+    return decorator
+
+
 def requires_login(func):
     """Makes a route require login to access."""
 
@@ -17,6 +17,24 @@ SETTINGS = {
     "REDIS_URL": "redis://localhost:6379/0",
     "EMAIL_BASE": "http://localhost:4444",
     "MEDIUM_PUBLICATION": "sayonika",
+    "HASH_WORKERS": 4,
+    "HASH_QUEUE_SIZE": 32,
+    "IPFS_API": "https://ipfs.infura.io:5001/api/v0",
+    "IPFS_CONCURRENCY": 8,
+    "IPFS_REQUEST_CONCURRENCY": 4,
+    "IPFS_TIMEOUT": 30,
+    "IPFS_RETRIES": 2,
+    "INGEST_WORKERS": 2,
+    "THUMBNAIL_WORKERS": 2,
+    "DOWNLOAD_BUCKET_SIZE": 3600,
+    "DOWNLOAD_FLUSH_INTERVAL": 60,
+    "TRENDING_HALF_LIFE": 86400,
+    "TRENDING_INTERVAL": 300,
+    "NEWS_REFRESH_INTERVAL": 900,
+    "MAILGUN_API": "https://api.mailgun.net/v3/sayonika.moe",
+    "MAIL_WORKERS": 1,
+    "METRICS_FLUSH_INTERVAL": 10,
+    "SLOW_QUERY_THRESHOLD": 250,
 }
 
 SETTINGS.update({k[9:]: v for k, v in os.environ.items() if k.startswith("SAYONIKA_")})
@@ -0,0 +1,91 @@
+# Stdlib
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import Dict, Tuple
+
+# External Libraries
+from PIL import Image, ImageOps, features
+
+__all__ = ("VARIANTS", "ThumbnailPool", "make_thumbnails")
+
+# Longest side, in pixels, of each size variant. Images are never scaled up.
+VARIANTS = {"small": 256, "medium": 768}
+
+
+def make_thumbnails(data: bytes) -> Dict[str, Tuple[bytes, str]]:
+    """
+    Builds every size variant of an image, as `(data, extension)` pairs. Uses WEBP if
+    Pillow was built with it, and JPEG otherwise.
+    """
+    webp = features.check("webp")
+    image = Image.open(BytesIO(data))
+    # Lets JPEGs be decoded at a fraction of their size, which is much faster.
+    image.draft("RGB", (max(VARIANTS.values()),) * 2)
+    image = ImageOps.exif_transpose(image)
+
+    if webp:
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+    else:
+        image = image.convert("RGB")
+
+    thumbnails = {}
+
+    for name, size in VARIANTS.items():
+        thumbnail = image.copy()
+        thumbnail.thumbnail((size, size), Image.LANCZOS)
+        out = BytesIO()
+
+        if webp:
+            thumbnail.save(out, "WEBP", quality=80, method=4)
+        else:
+            thumbnail.save(out, "JPEG", quality=80, optimize=True, progressive=True)
+
+        thumbnails[name] = (out.getvalue(), "webp" if webp else "jpeg")
+
+    return thumbnails
+
+
+class ThumbnailPool:
+    """
+    Process pool for generating image variants off of the event loop.
+    Decoding and resizing hold the GIL, so unlike `HashingPool` this needs processes
+    rather than threads to not stall every other request on the worker.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.executor = ProcessPoolExecutor(workers)
+        self.in_flight = 0
+        self.generated = 0
+        self.failed = 0
+
+    async def generate(self, data: bytes) -> Dict[str, Tuple[bytes, str]]:
+        """Runs `make_thumbnails` in the pool."""
+        self.in_flight += 1
+
+        try:
+            thumbnails = await asyncio.get_event_loop().run_in_executor(
+                self.executor, make_thumbnails, data
+            )
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+        self.generated += 1
+
+        return thumbnails
+
+    def close(self):
+        self.executor.shutdown()
+
+    def stats(self) -> Dict[str, int]:
+        """Job counters for this worker."""
+        return {
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "generated": self.generated,
+            "failed": self.failed,
+        }
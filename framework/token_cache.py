@@ -0,0 +1,157 @@
+# Stdlib
+from collections import Counter
+from datetime import datetime
+import json
+import logging
+from typing import Dict, Optional, NamedTuple
+
+# External Libraries
+from aioredis import RedisError
+from cachetools import TTLCache
+
+# Sayonika Internals
+import framework.models
+
+__all__ = ("AuthRecord", "TokenCache")
+
+logger = logging.getLogger("Sayonika")
+
+# Only caches a record if the user's generation is still the one read before loading
+# it, so a record loaded before an invalidation can't be cached after it.
+SET_SCRIPT = """
+if (redis.call("GET", KEYS[2]) or "0") == ARGV[1] then
+    redis.call("SET", KEYS[1], ARGV[2], "EX", ARGV[3])
+    return 1
+end
+return 0
+"""
+
+
+class AuthRecord(NamedTuple):
+    """The parts of a user needed to validate their login token and permissions."""
+
+    id: str
+    last_pass_reset: Optional[datetime]
+    email_verified: bool
+    supporter: bool
+    developer: bool
+    moderator: bool
+    editor: bool
+
+
+class TokenCache:
+    """
+    Short-lived cache of the user data needed for validating login tokens.
+    Records are kept in Redis so all workers share them, with a small in-process LRU in
+    front. Anything that changes a user's password, roles or email verification must
+    call `invalidate`, otherwise revoked tokens keep working until the entry expires.
+    Invalidating bumps a per-user generation, and records loaded from an older one
+    aren't cached, so a load racing an invalidation can't bring the old data back.
+    Other workers may still serve their local copy for up to `local_ttl` seconds.
+    """
+
+    key_format = "sayonika:auth:{}"
+    generation_format = "sayonika:auth:generation:{}"
+
+    def __init__(
+        self, redis, ttl: int = 60, local_ttl: int = 5, local_size: int = 1024
+    ):
+        self.redis = redis
+        self.ttl = ttl
+        self.local = TTLCache(local_size, local_ttl)
+        self.hits = Counter()
+        self.misses = 0
+
+    @staticmethod
+    def _dump(record: AuthRecord) -> str:
+        data = record._asdict()
+
+        if record.last_pass_reset is not None:
+            data["last_pass_reset"] = record.last_pass_reset.isoformat()
+
+        return json.dumps(data)
+
+    @staticmethod
+    def _load(data: str) -> AuthRecord:
+        record = AuthRecord(**json.loads(data))
+
+        if record.last_pass_reset is not None:
+            record = record._replace(
+                last_pass_reset=datetime.fromisoformat(record.last_pass_reset)
+            )
+
+        return record
+
+    async def get(self, id_: str) -> Optional[AuthRecord]:
+        """Gets the auth record for a user, falling back to the database on a miss."""
+        record = self.local.get(id_)
+
+        if record is not None:
+            self.hits["local"] += 1
+            return record
+
+        key = self.key_format.format(id_)
+        generation_key = self.generation_format.format(id_)
+
+        try:
+            data, generation = await self.redis.mget(key, generation_key)
+            generation = (generation or b"0").decode()
+        except (RedisError, OSError):
+            # Redis being unavailable shouldn't lock everyone out
+            data = generation = None
+
+        if data is not None:
+            self.hits["redis"] += 1
+            record = self._load(data)
+        else:
+            self.misses += 1
+            user = await framework.models.User.get(id_)
+
+            if user is None:
+                return None
+
+            record = AuthRecord(**{k: getattr(user, k) for k in AuthRecord._fields})
+
+            if generation is not None:
+                try:
+                    cached = await self.redis.eval(
+                        SET_SCRIPT,
+                        keys=[key, generation_key],
+                        args=[generation, self._dump(record), self.ttl],
+                    )
+                except (RedisError, OSError):
+                    cached = True
+
+                if not cached:
+                    # Invalidated while it was being loaded, so it may be outdated.
+                    return record
+
+        self.local[id_] = record
+
+        return record
+
+    async def invalidate(self, id_: str):
+        """Drops the cached record for a user. Call after changing their auth data."""
+        self.local.pop(id_, None)
+        generation_key = self.generation_format.format(id_)
+
+        transaction = self.redis.multi_exec()
+        transaction.incr(generation_key)
+        # Has to outlive any load that started before it was bumped.
+        transaction.expire(generation_key, self.ttl * 10)
+        transaction.delete(self.key_format.format(id_))
+
+        try:
+            await transaction.execute()
+        except (RedisError, OSError):
+            # The change is already committed, so failing the request won't undo it.
+            # The stale record is used until it expires, at most `ttl` seconds.
+            logger.exception(f"Couldn't invalidate the cached auth record of {id_}")
+
+    def stats(self) -> Dict[str, int]:
+        """Hit and miss counters for this worker."""
+        return {
+            "local_hits": self.hits["local"],
+            "redis_hits": self.hits["redis"],
+            "misses": self.misses,
+        }
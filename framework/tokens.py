@@ -1,6 +1,6 @@
 # Stdlib
 from datetime import datetime, timedelta
-from typing import Union
+from typing import Union, Optional
 
 # External Libraries
 import jwt
@@ -8,6 +8,7 @@ import jwt
 # Sayonika Internals
 # from framework.models import User
 from framework.jsonutils import CombinedEncoder
+from framework.token_cache import AuthRecord, TokenCache
 import framework.models
 
 
@@ -16,9 +17,10 @@ class JWT:
 
     algorithm = "HS256"
 
-    def __init__(self, settings: dict):
+    def __init__(self, settings: dict, cache: TokenCache):
         # `settings` is the dict of all ENV vars starting with SAYONIKA_
         self.secret = settings["JWT_SECRET"]
+        self.cache = cache
 
     def _make_token(self, payload: dict) -> str:
         """Internal method for generating a token with consistent settings."""
@@ -47,24 +49,43 @@ class JWT:
 
         return self._make_token(payload)
 
-    async def verify_login_token(
-        self, token: str, return_parsed: bool = False
-    ) -> Union[dict, bool]:
-        """Verify/validates a login token, and returns its data if specified."""
+    def _decode_login_token(self, token: str) -> Optional[dict]:
+        """Internal method for decoding a login token, without checking the database."""
         try:
             decoded = jwt.decode(token, self.secret, algorithms=[self.algorithm])
         except jwt.PyJWTError:
-            return False  # Any errors thrown during decoding probably indicate bad token in some way
+            return None  # Any errors thrown during decoding probably indicate bad token in some way
 
         if set(decoded.keys()) != set(["id", "lr", "iat"]):
-            return False  # Keys should only be the ones we give
+            return None  # Keys should only be the ones we give
 
-        user = await framework.models.User.get(decoded["id"])
+        return decoded
+
+    async def _get_token_user(self, decoded: dict) -> Optional[AuthRecord]:
+        """Internal method for getting the user of a decoded token, if still valid."""
+        user = await self.cache.get(decoded["id"])
 
         if (
             user is None
             or datetime.fromisoformat(decoded["lr"]) != user.last_pass_reset
         ):
+            return None
+
+        return user
+
+    async def get_login_user(self, token: str) -> Optional[AuthRecord]:
+        """Validates a login token, and returns the user it belongs to if valid."""
+        decoded = self._decode_login_token(token)
+
+        return await self._get_token_user(decoded) if decoded is not None else None
+
+    async def verify_login_token(
+        self, token: str, return_parsed: bool = False
+    ) -> Union[dict, bool]:
+        """Verify/validates a login token, and returns its data if specified."""
+        decoded = self._decode_login_token(token)
+
+        if decoded is None or await self._get_token_user(decoded) is None:
             return False
 
         return decoded if return_parsed else True
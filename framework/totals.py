@@ -0,0 +1,89 @@
+# Stdlib
+from enum import Enum
+import hashlib
+import json
+from typing import Any, Dict, Tuple, Optional
+
+# External Libraries
+from aioredis import RedisError
+from sqlalchemy.orm import Query
+
+# Sayonika Internals
+from framework.db import db
+
+__all__ = ("TotalCounter",)
+
+
+class TotalCounter:
+    """
+    Gets the total amount of results for listings without running a COUNT(*) each time.
+    Exact counts are cached in Redis per listing and set of filters for a short while.
+    Unfiltered listings of big tables use the planner's row estimate instead, as an
+    exact count there costs more than the page itself.
+    """
+
+    key_format = "sayonika:total:{}:{}"
+
+    def __init__(self, redis, ttl: int = 30, estimate_threshold: int = 100000):
+        self.redis = redis
+        self.ttl = ttl
+        self.estimate_threshold = estimate_threshold
+
+    @staticmethod
+    def _filters_key(filters: Dict[str, Any]) -> str:
+        normalized = {
+            k: v.name if isinstance(v, Enum) else v
+            for k, v in filters.items()
+            if v is not None
+        }
+        data = json.dumps(normalized, sort_keys=True, default=str).encode()
+
+        return hashlib.sha1(data).hexdigest()  # noqa: S303
+
+    @staticmethod
+    async def _estimate(table: str) -> Optional[int]:
+        estimate = await db.scalar(
+            db.text("SELECT reltuples FROM pg_class WHERE relname = :table"),
+            table=table,
+        )
+
+        # Tables that haven't been analyzed yet have no (or a negative) estimate.
+        return int(estimate) if estimate is not None and estimate >= 0 else None
+
+    async def count(
+        self,
+        name: str,
+        query: Query,
+        filters: Dict[str, Any],
+        table: Optional[str] = None,
+    ) -> Tuple[int, bool]:
+        """
+        Gets the total amount of rows `query` matches, and whether it is an estimate.
+        `filters` should hold every argument that changes the query, as they make up the
+        cache key. `table` enables estimating when no filters are given, so only pass it
+        if the query without filters matches every row of the table.
+        """
+        if table is not None and not any(v is not None for v in filters.values()):
+            estimate = await self._estimate(table)
+
+            if estimate is not None and estimate >= self.estimate_threshold:
+                return estimate, True
+
+        key = self.key_format.format(name, self._filters_key(filters))
+
+        try:
+            cached = await self.redis.get(key)
+        except (RedisError, OSError):
+            cached = None
+
+        if cached is not None:
+            return int(cached), False
+
+        total = await query.alias().count().gino.scalar()
+
+        try:
+            await self.redis.set(key, total, expire=self.ttl)
+        except (RedisError, OSError):
+            pass
+
+        return total, False
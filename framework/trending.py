@@ -0,0 +1,200 @@
+# Stdlib
+import asyncio
+from datetime import datetime, timedelta
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+# Sayonika Internals
+from framework.db import db
+
+__all__ = ("TrendingTracker",)
+
+logger = logging.getLogger("Sayonika")
+
+# Weighted activity per mod since the last update, with every event's weight grown by
+# how long after the epoch it happened.
+NEW_ACTIVITY = """
+    SELECT mod_id, sum(weight * power(2, (extract(epoch FROM created_at) - :epoch)
+        / :half_life)) AS score
+    FROM (
+        SELECT mod_id, created_at, {favorite} AS weight FROM user_favorite
+        WHERE created_at > :since AND created_at <= :until
+        UNION ALL
+        SELECT mod_id, created_at, {review} FROM review
+        WHERE created_at > :since AND created_at <= :until
+        UNION ALL
+        SELECT r.mod_id, rr.created_at, {reaction}
+        FROM review_reaction rr
+        JOIN review r ON r.id = rr.review_id
+        WHERE rr.created_at > :since AND rr.created_at <= :until
+        AND rr.reaction IN ('upvote', 'funny')
+    ) events
+    GROUP BY mod_id
+"""
+
+
+class TrendingTracker:
+    """
+    Ranks mods by recent activity in a Redis sorted set, so reading the trending mods
+    doesn't need to go through every event.
+    Events lose half their weight every `half_life` seconds. Rather than decaying every
+    score over time, new events are given a weight that grows exponentially with how
+    long after an epoch they happened, which ranks the same. Each update only adds
+    the events since the last one, and scores are rescaled to a new epoch every so
+    often to keep them from overflowing. Mods with no activity for `window` seconds
+    drop out of the ranking.
+    """
+
+    key = "sayonika:trending"
+    epoch_key = "sayonika:trending:epoch"
+    watermark_key = "sayonika:trending:watermark"
+    downloads_key = "sayonika:trending:downloads"
+    downloads_applying_key = "sayonika:trending:downloads:applying"
+    lock_key = "sayonika:trending:lock"
+
+    weights = {"download": 1, "favorite": 5, "review": 3, "reaction": 1}
+
+    def __init__(
+        self,
+        redis,
+        half_life: int = 24 * 60 * 60,
+        interval: int = 5 * 60,
+        window: int = 7 * 24 * 60 * 60,
+        # Leaves time for transactions to commit events with earlier timestamps.
+        lag: int = 60,
+    ):
+        self.redis = redis
+        self.half_life = half_life
+        self.interval = interval
+        self.window = window
+        self.lag = lag
+        self.task = None
+        self.updates = 0
+        self.last_update = None
+        self.last_duration = None
+
+    def _growth(self, epoch: float, at: float) -> float:
+        return 2 ** ((at - epoch) / self.half_life)
+
+    async def add_downloads(self, counts: Dict[str, int]):
+        """Queues downloads to be added on the next update."""
+        if not counts:
+            return
+
+        transaction = self.redis.multi_exec()
+
+        for mod_id, count in counts.items():
+            transaction.hincrby(self.downloads_key, mod_id, count)
+
+        await transaction.execute()
+
+    async def get(self, limit: int = 10) -> List[str]:
+        """Gets the IDs of the most trending mods."""
+        return [x.decode() for x in await self.redis.zrevrange(self.key, 0, limit - 1)]
+
+    async def update(self):
+        """Adds the activity since the last update, if no other worker is already."""
+        if not await self.redis.set(
+            self.lock_key, 1, expire=self.interval, exist=self.redis.SET_IF_NOT_EXIST
+        ):
+            return
+
+        try:
+            await self._update()
+        finally:
+            await self.redis.delete(self.lock_key)
+
+    async def _update(self):
+        started = time.monotonic()
+        now = time.time()
+        until = now - self.lag
+        epoch, watermark = await self.redis.mget(self.epoch_key, self.watermark_key)
+        since = float(watermark) if watermark is not None else now - self.window
+
+        if epoch is None:
+            epoch = until
+            await self.redis.set(self.epoch_key, epoch)
+        else:
+            epoch = float(epoch)
+
+        # Keeps scores well within what a double can hold.
+        if until - epoch > 32 * self.half_life:
+            await self._rebase(epoch, until)
+            epoch = until
+
+        rows = await db.all(
+            db.text(NEW_ACTIVITY.format(**self.weights)),
+            epoch=epoch,
+            half_life=self.half_life,
+            since=datetime.utcfromtimestamp(since),
+            until=datetime.utcfromtimestamp(until),
+        )
+        scores = {mod_id: float(score) for mod_id, score in rows}
+
+        # Downloads come from `DownloadCounter` flushes, so they count from now. Ones
+        # left over from an update that didn't finish go first.
+        if await self.redis.exists(self.downloads_key):
+            await self.redis.renamenx(self.downloads_key, self.downloads_applying_key)
+
+        downloads = await self.redis.hgetall(self.downloads_applying_key)
+        growth = self._growth(epoch, now)
+
+        for mod_id, count in downloads.items():
+            mod_id = mod_id.decode()
+            scores[mod_id] = (
+                scores.get(mod_id, 0) + self.weights["download"] * int(count) * growth
+            )
+
+        transaction = self.redis.multi_exec()
+
+        for mod_id, score in scores.items():
+            transaction.zincrby(self.key, score, mod_id)
+
+        transaction.delete(self.downloads_applying_key)
+        transaction.set(self.watermark_key, until)
+        # Whatever has decayed below a single download from a window ago is dropped.
+        transaction.zremrangebyscore(
+            self.key, max=self._growth(epoch, now - self.window)
+        )
+        await transaction.execute()
+
+        self.updates += 1
+        self.last_update = datetime.utcnow()
+        self.last_duration = timedelta(seconds=time.monotonic() - started)
+
+    async def _rebase(self, epoch: float, new_epoch: float):
+        transaction = self.redis.multi_exec()
+        transaction.zunionstore(
+            self.key, (self.key, 1 / self._growth(epoch, new_epoch)), with_weights=True
+        )
+        transaction.set(self.epoch_key, new_epoch)
+        await transaction.execute()
+
+    async def _update_loop(self):
+        while True:
+            try:
+                await self.update()
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Trending update failed")
+
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Starts updating every `interval` seconds."""
+        self.task = asyncio.ensure_future(self._update_loop())
+
+    async def stop(self):
+        """Stops updating."""
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    def stats(self) -> Dict[str, Optional[Any]]:
+        """Update counters for this worker."""
+        return {
+            "updates": self.updates,
+            "last_update": self.last_update,
+            "last_duration": self.last_duration,
+        }
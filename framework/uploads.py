@@ -0,0 +1,164 @@
+# Stdlib
+from typing import Tuple, Optional, AsyncIterator
+
+# External Libraries
+from quart import abort, request
+from quart.wrappers.request import Body
+
+__all__ = ("UploadError", "ImageUpload", "sniff_image")
+
+ACCEPTED_TYPES = ("png", "jpeg", "webp")
+# Enough of the start of a file to recognize any of the accepted types.
+SNIFF_SIZE = 12
+# Multipart bodies may only have this much before the file's content starts.
+MAX_HEADERS_SIZE = 16 * 1024
+
+
+def sniff_image(data: bytes) -> Optional[str]:
+    """Gets the type of an image from its first bytes, if it's PNG, JPEG or WEBP."""
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if data.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+
+    return None
+
+
+class UploadError(Exception):
+    """Raised when an upload is rejected while it's being streamed."""
+
+
+class ImageUpload:
+    """
+    Reads an image from the request body as it arrives, sent either as the raw body or
+    as the first file of a multipart/form-data body. Only one chunk is held at a time,
+    and the size is checked as chunks come in instead of after buffering everything.
+    """
+
+    def __init__(self, name: str, max_size: int = 5 * 1000 * 1000):
+        self.name = name
+        self.max_size = max_size
+        self.size = 0
+        self.type: Optional[str] = None
+        self.error: Optional[Tuple[int, str]] = None
+        self._chunks: Optional[AsyncIterator[bytes]] = None
+        self._head = b""
+
+    @property
+    def filename(self) -> str:
+        return f"{self.name}.{self.type}"
+
+    def _fail(self, status: int, message: str):
+        self.error = (status, message)
+        raise UploadError(message)
+
+    @staticmethod
+    async def _raw(body: Body) -> AsyncIterator[bytes]:
+        async for chunk in body:
+            yield chunk
+
+    async def _multipart(self, body: Body, boundary: bytes) -> AsyncIterator[bytes]:
+        delimiter = b"\r\n--" + boundary
+        # Starting with a line break lets the opening delimiter match like the others.
+        buffer = bytearray(b"\r\n")
+        body = body.__aiter__()
+
+        async def fill():
+            try:
+                buffer.extend(await body.__anext__())
+            except StopAsyncIteration:
+                self._fail(400, "Malformed multipart body")
+
+        while True:
+            start = buffer.find(delimiter)
+            end = buffer.find(b"\r\n\r\n", start) if start != -1 else -1
+
+            if end != -1:
+                break
+            if len(buffer) > MAX_HEADERS_SIZE:
+                self._fail(400, "Malformed multipart body")
+
+            await fill()
+
+        if b"filename=" not in buffer[start:end]:
+            self._fail(400, f"`{self.name}` should be sent as a file")
+
+        del buffer[: end + 4]
+
+        # Hold back enough of the buffer to spot a delimiter split between chunks.
+        keep = len(delimiter) - 1
+
+        while True:
+            index = buffer.find(delimiter)
+
+            if index != -1:
+                yield bytes(buffer[:index])
+                return
+
+            if len(buffer) > keep:
+                yield bytes(buffer[:-keep])
+                del buffer[:-keep]
+
+            await fill()
+
+    async def start(self):
+        """
+        Reads the start of the image and checks its type, aborting if it isn't an
+        accepted image. Must be called before `chunks`.
+        """
+        mimetype = request.mimetype
+
+        if mimetype == "multipart/form-data":
+            boundary = request.mimetype_params.get("boundary")
+
+            if not boundary:
+                abort(400, "Missing multipart boundary")
+
+            self._chunks = self._multipart(request.body, boundary.encode())
+        elif mimetype in [f"image/{x}" for x in ACCEPTED_TYPES] + [
+            "application/octet-stream"
+        ]:
+            self._chunks = self._raw(request.body)
+        else:
+            abort(415, f"`{self.name}` should be sent as an image or multipart form")
+
+        try:
+            while len(self._head) < SNIFF_SIZE:
+                self._head += await self._chunks.__anext__()
+        except StopAsyncIteration:
+            pass
+        except UploadError:
+            abort(*self.error)
+
+        self.type = sniff_image(self._head)
+
+        if self.type is None:
+            abort(400, f"`{self.name}` data is not PNG, JPEG, or WEBP")
+        elif mimetype.startswith("image/") and mimetype != f"image/{self.type}":
+            abort(400, f"`{self.name}` mimetype and data mismatch")
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        """
+        The image's data. Raises `UploadError` part way through if the image is too
+        big or the body is malformed, with the response to give in `error`.
+        """
+        chunk = self._head
+
+        while True:
+            self.size += len(chunk)
+
+            if self.size > self.max_size:
+                self._fail(
+                    413,
+                    f"`{self.name}` should be less than {self.max_size // 1000000}MB",
+                )
+
+            if chunk:
+                yield chunk
+
+            try:
+                chunk = await self._chunks.__anext__()
+            except StopAsyncIteration:
+                return
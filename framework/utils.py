@@ -1,18 +1,27 @@
 # Stdlib
+import asyncio
+import base64
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+from decimal import Decimal
 import hashlib
-import mimetypes
+import json
+import operator
 import string
-from typing import Optional
+from typing import Any, List, Tuple, Optional, Awaitable, AsyncIterator
 import urllib.parse as urlp
 
 # External Libraries
 import aiohttp
-from quart import abort, request
+from quart import abort
+from sqlalchemy import and_, tuple_
 from sqlalchemy.orm import Query
+from sqlalchemy.sql.elements import ColumnElement
 from unidecode import unidecode
 
 # Sayonika Internals
-from framework.objects import SETTINGS, jwt_service
+from framework.identity import get_request_user
+from framework.objects import SETTINGS
 
 GRAVATAR_BASE = "https://www.gravatar.com/avatar/{}?s=512"  # noqa: P103
 DEFAULT_AVATAR = GRAVATAR_BASE.format(
@@ -58,6 +67,127 @@ def paginate(query: Query, page: int, limit: int = 50) -> Query:
     return query.limit(limit).offset(page * limit)
 
 
+@asynccontextmanager
+async def in_background(coro: Awaitable) -> AsyncIterator[asyncio.Future]:
+    """
+    Runs a coroutine alongside the body of an `async with`, such as counting a listing
+    while its page is fetched. It's cancelled if the body is left without awaiting it,
+    so it doesn't outlive requests that fail, e.g. ones with an invalid cursor.
+    """
+    task = asyncio.ensure_future(coro)
+
+    try:
+        yield task
+    finally:
+        task.cancel()
+
+
+def keyset_order(
+    query: Query,
+    column: Optional[ColumnElement],
+    id_column: ColumnElement,
+    ascending: bool = False,
+) -> Query:
+    """
+    Orders a query by a sort column and then id, with nulls last, so that every row has
+    a stable position that a cursor can point at. Use before `paginate` as well, so
+    that cursors from `next_cursor` carry on from page based results.
+    """
+    direction = (lambda x: x.asc()) if ascending else (lambda x: x.desc())
+
+    if column is None:
+        return query.order_by(direction(id_column))
+
+    return query.order_by(direction(column).nullslast(), direction(id_column))
+
+
+def encode_cursor(value: Any, id_: str) -> str:
+    """Encodes the sort value and id of a row into an opaque cursor."""
+    if isinstance(value, (date, datetime)):
+        value = value.isoformat()
+    elif isinstance(value, Decimal):
+        value = str(value)
+
+    return base64.urlsafe_b64encode(json.dumps([value, id_]).encode()).decode()
+
+
+def decode_cursor(cursor: str, column: Optional[ColumnElement]) -> Tuple[Any, str]:
+    """Decodes a cursor back into the sort value and id it was made from."""
+    try:
+        value, id_ = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+
+        if value is not None and column is not None:
+            type_ = column.type.python_type
+            value = (
+                type_.fromisoformat(value)
+                if type_ in (date, datetime)
+                else type_(value)
+            )
+    except (ValueError, TypeError):
+        abort(400, "Invalid cursor")
+
+    return value, id_
+
+
+def next_cursor(
+    results: list, column: Optional[ColumnElement], limit: int
+) -> Optional[str]:
+    """Makes the cursor for the page after `results`, if there might be one."""
+    if len(results) < limit:
+        return None
+
+    last = results[-1]
+
+    return encode_cursor(
+        getattr(last, column.key) if column is not None else None, last.id
+    )
+
+
+async def keyset_paginate(
+    query: Query,
+    column: Optional[ColumnElement],
+    id_column: ColumnElement,
+    cursor: Optional[str],
+    limit: int = 50,
+    ascending: bool = False,
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Gets the page of a query after `cursor`, by seeking past the last seen row instead
+    of using an offset, so deep pages cost the same as the first one given an index in
+    the order of `keyset_order`. Returns the results along with the cursor for the next
+    page.
+    """
+    compare = operator.gt if ascending else operator.lt
+    ordered = keyset_order(query, column, id_column, ascending)
+
+    if cursor is None:
+        results = await ordered.limit(limit).gino.all()
+    else:
+        value, id_ = decode_cursor(cursor, column)
+
+        if column is None:
+            condition = compare(id_column, id_)
+        elif value is None:
+            condition = and_(column.is_(None), compare(id_column, id_))
+        else:
+            # Comparing against NULL is never true, so this only walks the non-null rows
+            condition = compare(tuple_(column, id_column), tuple_(value, id_))
+
+        results = await ordered.where(condition).limit(limit).gino.all()
+
+        if column is not None and value is not None and len(results) < limit:
+            # Ran out of non-null rows, so carry on into the null ones which sort last.
+            results += (
+                await keyset_order(
+                    query.where(column.is_(None)), None, id_column, ascending
+                )
+                .limit(limit - len(results))
+                .gino.all()
+            )
+
+    return results, next_cursor(results, column, limit)
+
+
 async def verify_recaptcha(
     token: str, session: aiohttp.ClientSession, action: Optional[str] = None
 ) -> float:
@@ -81,22 +211,8 @@ async def verify_recaptcha(
     return data["score"]
 
 
-async def get_token_user() -> str:
-    token = request.headers.get("Authorization", request.cookies.get("token"))
-    parsed_token = await jwt_service.verify_login_token(token, True)
-
-    return parsed_token["id"] if isinstance(parsed_token, dict) else None
-
-
-async def ipfs_upload(
-    file: bytes, filename: str, session: aiohttp.ClientSession
-) -> dict:
-    form = aiohttp.FormData()
-    form.add_field(
-        "file", file, filename=filename, content_type=mimetypes.guess_type(filename)[0]
-    )
-
-    async with session.post("https://ipfs.infura.io:5001/api/v0/add") as resp:
-        data = await resp.json()
+async def get_token_user() -> Optional[str]:
+    """Gets the id of the user that made the current request, if any."""
+    user = await get_request_user()
 
-    return data
+    return user.id if user is not None else None
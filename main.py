@@ -2,10 +2,32 @@
 import sys
 
 # External Libraries
+import click
 from sqlalchemy.engine.url import URL
 
 # Sayonika Internals
-from framework.objects import db, loop, redis, sayonika_instance
+from framework.db import DRIVER
+from framework.objects import (
+    db,
+    loop,
+    redis,
+    mailer,
+    metrics,
+    trending,
+    news_feed,
+    mail_outbox,
+    ingest_queue,
+    thumbnail_pool,
+    download_counter,
+    sayonika_instance,
+)
+from framework.maintenance import (
+    check_ratings,
+    backfill_ratings,
+    backfill_variants,
+    backfill_favorites,
+    backfill_reactions,
+)
 from framework.settings import SETTINGS
 
 
@@ -13,7 +35,7 @@ async def setup_db():
     # Set binding for Gino and init Redis
     await db.set_bind(
         URL(
-            "postgres",
+            DRIVER,
             username=SETTINGS["DB_USER"],
             password=SETTINGS["DB_PASS"],
             host=SETTINGS["DB_HOST"],
@@ -25,13 +47,77 @@ async def setup_db():
     # await redis.setup()
 
 
+@sayonika_instance.before_serving
+async def start_workers():
+    ingest_queue.start(sayonika_instance.aioh_sess)
+    download_counter.start()
+    metrics.start()
+    trending.start()
+    news_feed.start(sayonika_instance.aioh_sess)
+    await mailer.load_templates()
+    mail_outbox.start(sayonika_instance.aioh_sess)
+
+
 @sayonika_instance.after_serving
 async def teardown():
+    await ingest_queue.stop()
+    thumbnail_pool.close()
+    await download_counter.stop()
+    await trending.stop()
+    await news_feed.stop()
+    await mail_outbox.stop()
+    await metrics.stop()
     await sayonika_instance.aioh_sess.close()
     await db.pop_bind().close()
     redis.close()
 
 
+@sayonika_instance.cli.command("backfill-ratings")
+def backfill_ratings_command():
+    """Recompute the rating aggregates of every mod from its reviews."""
+    updated = loop.run_until_complete(backfill_ratings())
+    click.echo(f"Updated rating aggregates of {updated} mods")
+
+
+@sayonika_instance.cli.command("backfill-reactions")
+def backfill_reactions_command():
+    """Recompute the reaction counters of every review."""
+    updated = loop.run_until_complete(backfill_reactions())
+    click.echo(f"Updated reaction counters of {updated} reviews")
+
+
+@sayonika_instance.cli.command("backfill-favorites")
+def backfill_favorites_command():
+    """Recompute the favorite count of every mod."""
+    updated = loop.run_until_complete(backfill_favorites())
+    click.echo(f"Updated favorite counts of {updated} mods")
+
+
+@sayonika_instance.cli.command("backfill-variants")
+def backfill_variants_command():
+    """Queue generating size variants for images that don't have them."""
+    queued = loop.run_until_complete(backfill_variants(ingest_queue))
+    click.echo(f"Queued size variants for {queued} images")
+
+
+@sayonika_instance.cli.command("check-ratings")
+@click.option("--fix", is_flag=True, help="Recompute the mismatched mods.")
+def check_ratings_command(fix: bool):
+    """Find mods whose rating aggregates have drifted from their reviews."""
+    mismatched = loop.run_until_complete(check_ratings())
+
+    for mod_id in mismatched:
+        click.echo(f"Mismatched rating aggregates: {mod_id}")
+
+    if mismatched and fix:
+        updated = loop.run_until_complete(backfill_ratings(mismatched))
+        click.echo(f"Fixed rating aggregates of {updated} mods")
+    elif mismatched:
+        sys.exit(1)
+    else:
+        click.echo("All rating aggregates are consistent")
+
+
 sayonika_instance.debug = len(sys.argv) > 1 and sys.argv[1] == "--debug"
 sayonika_instance.gather("routes")
 loop.run_until_complete(setup_db())
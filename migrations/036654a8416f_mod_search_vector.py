@@ -0,0 +1,68 @@
+# flake8: noqa: E128
+"""
+Mod search vector
+
+Revision ID: 036654a8416f
+Revises: c4ac52456d9c
+Create Date: 2020-02-02 14:05:41.203911+00:00
+"""
+
+# External Libraries
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "036654a8416f"
+down_revision = "c4ac52456d9c"
+branch_labels = None
+depends_on = None
+
+# Title matches rank above tagline matches, which rank above description matches.
+search_vector = """
+    setweight(to_tsvector('english', coalesce({0}title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce({0}tagline, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce({0}description, '')), 'C')
+"""
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.add_column(
+        "mod", sa.Column("search_vector", postgresql.TSVECTOR(), nullable=True)
+    )
+    op.execute(f"""
+        CREATE FUNCTION mod_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector := {search_vector.format("NEW.")};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """)
+    op.execute("""
+        CREATE TRIGGER mod_search_vector_update
+        BEFORE INSERT OR UPDATE OF title, tagline, description ON mod
+        FOR EACH ROW EXECUTE PROCEDURE mod_search_vector_update()
+        """)
+    op.execute(f"UPDATE mod SET search_vector = {search_vector.format('')}")
+    op.create_index(
+        op.f("ix_mod_search_vector"),
+        "mod",
+        ["search_vector"],
+        postgresql_using="gin",
+    )
+    op.create_index(
+        op.f("ix_mod_title_trgm"),
+        "mod",
+        ["title"],
+        postgresql_using="gin",
+        postgresql_ops={"title": "gin_trgm_ops"},
+    )
+
+
+def downgrade():
+    op.drop_index(op.f("ix_mod_title_trgm"), table_name="mod")
+    op.drop_index(op.f("ix_mod_search_vector"), table_name="mod")
+    op.execute("DROP TRIGGER mod_search_vector_update ON mod")
+    op.execute("DROP FUNCTION mod_search_vector_update()")
+    op.drop_column("mod", "search_vector")
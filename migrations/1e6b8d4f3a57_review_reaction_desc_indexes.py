@@ -0,0 +1,41 @@
+# flake8: noqa: E128
+"""
+Review reaction descending indexes
+
+Revision ID: 1e6b8d4f3a57
+Revises: 7d3a5c8e0f26
+Create Date: 2020-03-02 09:44:26.730915+00:00
+"""
+
+# External Libraries
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "1e6b8d4f3a57"
+down_revision = "7d3a5c8e0f26"
+branch_labels = None
+depends_on = None
+
+counters = ("score", "funny_count")
+
+
+def upgrade():
+    # Reviews are only ever listed by these from the top down.
+    for counter in counters:
+        op.drop_index(op.f(f"ix_review_mod_id_{counter}_id"), table_name="review")
+        op.create_index(
+            op.f(f"ix_review_mod_id_{counter}_id_desc"),
+            "review",
+            ["mod_id", sa.text(f"{counter} DESC NULLS LAST"), sa.text("id DESC")],
+        )
+
+
+def downgrade():
+    for counter in counters:
+        op.drop_index(op.f(f"ix_review_mod_id_{counter}_id_desc"), table_name="review")
+        op.create_index(
+            op.f(f"ix_review_mod_id_{counter}_id"),
+            "review",
+            ["mod_id", counter, "id"],
+        )
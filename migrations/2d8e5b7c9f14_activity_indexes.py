@@ -0,0 +1,32 @@
+# flake8: noqa: E128
+"""
+Activity indexes
+
+Revision ID: 2d8e5b7c9f14
+Revises: 6c1f08d2a4e7
+Create Date: 2020-02-28 15:21:44.610392+00:00
+"""
+
+# External Libraries
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "2d8e5b7c9f14"
+down_revision = "6c1f08d2a4e7"
+branch_labels = None
+depends_on = None
+
+# Lets trending mods only go through the activity since it was last updated.
+tables = ["user_favorite", "review", "review_reaction"]
+
+
+def upgrade():
+    for table in tables:
+        op.create_index(
+            op.f(f"ix_{table}_created_at"), table, ["created_at"], unique=False
+        )
+
+
+def downgrade():
+    for table in tables:
+        op.drop_index(op.f(f"ix_{table}_created_at"), table_name=table)
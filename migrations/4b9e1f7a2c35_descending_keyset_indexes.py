@@ -0,0 +1,58 @@
+# flake8: noqa: E128
+"""
+Descending keyset indexes
+
+Revision ID: 4b9e1f7a2c35
+Revises: 8f4a2c6e1b93
+Create Date: 2020-03-02 09:14:51.603288+00:00
+"""
+
+# External Libraries
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "4b9e1f7a2c35"
+down_revision = "8f4a2c6e1b93"
+branch_labels = None
+depends_on = None
+
+# Listings default to `column DESC NULLS LAST, id DESC`, which the plain indexes can
+# only give with nulls first, so each sort gets an index in that order as well. The
+# plain ones are kept, as they still give the ascending order with nulls last.
+indexes = {
+    "mod": [
+        [None, "title"],
+        [None, "last_updated"],
+        [None, "released_at"],
+        [None, "downloads"],
+    ],
+    "user": [[None, "username"], [None, "created_at"]],
+    "review": [["mod_id", "created_at"], ["mod_id", "rating"]],
+}
+
+
+def index_name(table, prefix, column):
+    return op.f(f"ix_{table}_{prefix + '_' if prefix else ''}{column}_id_desc")
+
+
+def index_columns(prefix, column):
+    columns = [sa.text(f"{column} DESC NULLS LAST"), sa.text("id DESC")]
+
+    return [prefix, *columns] if prefix else columns
+
+
+def upgrade():
+    for table, column_sets in indexes.items():
+        for prefix, column in column_sets:
+            op.create_index(
+                index_name(table, prefix, column),
+                table,
+                index_columns(prefix, column),
+            )
+
+
+def downgrade():
+    for table, column_sets in indexes.items():
+        for prefix, column in column_sets:
+            op.drop_index(index_name(table, prefix, column), table_name=table)
@@ -0,0 +1,80 @@
+# flake8: noqa: E128
+"""
+Review reaction counters
+
+Revision ID: 530e3dafdbeb
+Revises: 9341a400c2e0
+Create Date: 2020-02-18 20:05:41.207634+00:00
+"""
+
+# External Libraries
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "530e3dafdbeb"
+down_revision = "9341a400c2e0"
+branch_labels = None
+depends_on = None
+
+counters = ["upvote_count", "downvote_count", "funny_count", "score"]
+
+
+def upgrade():
+    for counter in counters:
+        op.add_column(
+            "review",
+            sa.Column(counter, sa.Integer(), server_default="0", nullable=False),
+        )
+
+    # Counters rely on each reaction only existing once per user.
+    op.execute("""
+        DELETE FROM review_reaction a USING review_reaction b
+        WHERE a.review_id = b.review_id
+        AND a.user_id = b.user_id
+        AND a.reaction = b.reaction
+        AND a.ctid > b.ctid
+        """)
+    op.create_unique_constraint(
+        op.f("uq_review_reaction_review_id_user_id_reaction"),
+        "review_reaction",
+        ["review_id", "user_id", "reaction"],
+    )
+
+    op.execute("""
+        UPDATE review SET
+            upvote_count = agg.upvote_count,
+            downvote_count = agg.downvote_count,
+            funny_count = agg.funny_count,
+            score = agg.upvote_count - agg.downvote_count
+        FROM (
+            SELECT
+                review_id,
+                count(*) FILTER (WHERE reaction = 'upvote') AS upvote_count,
+                count(*) FILTER (WHERE reaction = 'downvote') AS downvote_count,
+                count(*) FILTER (WHERE reaction = 'funny') AS funny_count
+            FROM review_reaction
+            GROUP BY review_id
+        ) agg
+        WHERE review.id = agg.review_id
+        """)
+
+    op.create_index(
+        op.f("ix_review_mod_id_score_id"), "review", ["mod_id", "score", "id"]
+    )
+    op.create_index(
+        op.f("ix_review_mod_id_funny_count_id"),
+        "review",
+        ["mod_id", "funny_count", "id"],
+    )
+
+
+def downgrade():
+    op.drop_index(op.f("ix_review_mod_id_funny_count_id"), table_name="review")
+    op.drop_index(op.f("ix_review_mod_id_score_id"), table_name="review")
+    op.drop_constraint(
+        op.f("uq_review_reaction_review_id_user_id_reaction"), "review_reaction"
+    )
+
+    for counter in counters:
+        op.drop_column("review", counter)
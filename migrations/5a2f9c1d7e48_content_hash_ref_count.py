@@ -0,0 +1,30 @@
+# flake8: noqa: E128
+"""
+Content hash reference count
+
+Revision ID: 5a2f9c1d7e48
+Revises: 1e6b8d4f3a57
+Create Date: 2020-03-02 10:06:42.915374+00:00
+"""
+
+# External Libraries
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "5a2f9c1d7e48"
+down_revision = "1e6b8d4f3a57"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing entries are at least used by the upload that made them.
+    op.add_column(
+        "content_hash",
+        sa.Column("ref_count", sa.Integer(), server_default="1", nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_column("content_hash", "ref_count")
@@ -0,0 +1,51 @@
+# flake8: noqa: E128
+"""
+Mod download stats
+
+Revision ID: 6c1f08d2a4e7
+Revises: e5a91c3d7b08
+Create Date: 2020-02-25 18:03:56.402731+00:00
+"""
+
+# External Libraries
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "6c1f08d2a4e7"
+down_revision = "e5a91c3d7b08"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "mod_download_stats",
+        sa.Column("id", sa.Unicode(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("mod_id", sa.Unicode(), nullable=True),
+        sa.Column("bucket", sa.DateTime(), nullable=False),
+        sa.Column("downloads", sa.BigInteger(), nullable=True),
+        sa.Column("unique_downloads", sa.BigInteger(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["mod_id"],
+            ["mod.id"],
+            name=op.f("fk_mod_download_stats_mod_id_mod"),
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_mod_download_stats")),
+        sa.UniqueConstraint(
+            "mod_id", "bucket", name=op.f("uq_mod_download_stats_mod_id")
+        ),
+    )
+    op.create_table(
+        "download_flush",
+        sa.Column("id", sa.Unicode(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_download_flush")),
+    )
+
+
+def downgrade():
+    op.drop_table("download_flush")
+    op.drop_table("mod_download_stats")
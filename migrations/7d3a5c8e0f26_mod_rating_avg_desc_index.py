@@ -0,0 +1,31 @@
+# flake8: noqa: E128
+"""
+Mod rating average descending index
+
+Revision ID: 7d3a5c8e0f26
+Revises: 4b9e1f7a2c35
+Create Date: 2020-03-02 09:31:07.118542+00:00
+"""
+
+# External Libraries
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "7d3a5c8e0f26"
+down_revision = "4b9e1f7a2c35"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Unrated mods have no average, so the default order puts them last.
+    op.create_index(
+        op.f("ix_mod_rating_avg_id_desc"),
+        "mod",
+        [sa.text("rating_avg DESC NULLS LAST"), sa.text("id DESC")],
+    )
+
+
+def downgrade():
+    op.drop_index(op.f("ix_mod_rating_avg_id_desc"), table_name="mod")
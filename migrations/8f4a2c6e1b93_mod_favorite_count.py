@@ -0,0 +1,73 @@
+# flake8: noqa: E128
+"""
+Mod favorite count
+
+Revision ID: 8f4a2c6e1b93
+Revises: 2d8e5b7c9f14
+Create Date: 2020-03-01 12:38:09.274513+00:00
+"""
+
+# External Libraries
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "8f4a2c6e1b93"
+down_revision = "2d8e5b7c9f14"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "mod",
+        sa.Column("favorite_count", sa.Integer(), server_default="0", nullable=False),
+    )
+    # Only verified mods are listed, so most loved is a scan of the top of this.
+    op.create_index(
+        op.f("ix_mod_favorite_count_id"),
+        "mod",
+        [sa.text("favorite_count DESC"), sa.text("id DESC")],
+        postgresql_where=sa.text("verified"),
+    )
+
+    op.execute("""
+        CREATE FUNCTION mod_favorite_update() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                UPDATE mod SET favorite_count = favorite_count - 1
+                WHERE id = OLD.mod_id;
+            END IF;
+
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                UPDATE mod SET favorite_count = favorite_count + 1
+                WHERE id = NEW.mod_id;
+            END IF;
+
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """)
+    op.execute("""
+        CREATE TRIGGER mod_favorite_update
+        AFTER INSERT OR UPDATE OF mod_id OR DELETE ON user_favorite
+        FOR EACH ROW EXECUTE PROCEDURE mod_favorite_update()
+        """)
+
+    # Backfill from existing favorites
+    op.execute("""
+        UPDATE mod SET favorite_count = agg.favorite_count
+        FROM (
+            SELECT mod_id, count(*) AS favorite_count
+            FROM user_favorite
+            GROUP BY mod_id
+        ) agg
+        WHERE mod.id = agg.mod_id
+        """)
+
+
+def downgrade():
+    op.execute("DROP TRIGGER mod_favorite_update ON user_favorite")
+    op.execute("DROP FUNCTION mod_favorite_update()")
+    op.drop_index(op.f("ix_mod_favorite_count_id"), table_name="mod")
+    op.drop_column("mod", "favorite_count")
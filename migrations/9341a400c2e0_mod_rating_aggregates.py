@@ -0,0 +1,113 @@
+# flake8: noqa: E128
+"""
+Mod rating aggregates
+
+Revision ID: 9341a400c2e0
+Revises: a853be39b7a1
+Create Date: 2020-02-16 16:47:03.518290+00:00
+"""
+
+# External Libraries
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "9341a400c2e0"
+down_revision = "a853be39b7a1"
+branch_labels = None
+depends_on = None
+
+# Star buckets match the rating filter, where 1 also covers 0.5 ratings.
+bucket = "greatest(floor({0}.rating)::int, 1)"
+adjust_rating = """
+    UPDATE mod SET
+        rating_sum = rating_sum {op} {row}.rating,
+        rating_count = rating_count {op} 1,
+        rating_avg = (rating_sum {op} {row}.rating) / nullif(rating_count {op} 1, 0),
+        rating_histogram[{bucket}] = rating_histogram[{bucket}] {op} 1
+    WHERE id = {row}.mod_id;
+"""
+
+
+def upgrade():
+    op.add_column(
+        "mod",
+        sa.Column("rating_sum", sa.Numeric(), server_default="0", nullable=False),
+    )
+    op.add_column(
+        "mod",
+        sa.Column("rating_count", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.add_column("mod", sa.Column("rating_avg", sa.Numeric(), nullable=True))
+    op.add_column(
+        "mod",
+        sa.Column(
+            "rating_histogram",
+            postgresql.ARRAY(sa.Integer()),
+            server_default="{0,0,0,0,0}",
+            nullable=False,
+        ),
+    )
+    op.create_index(op.f("ix_mod_rating_avg_id"), "mod", ["rating_avg", "id"])
+
+    removed = adjust_rating.format(op="-", row="OLD", bucket=bucket.format("OLD"))
+    added = adjust_rating.format(op="+", row="NEW", bucket=bucket.format("NEW"))
+    op.execute(f"""
+        CREATE FUNCTION mod_rating_update() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                IF OLD.rating IS NOT NULL THEN
+                    {removed}
+                END IF;
+            END IF;
+
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                IF NEW.rating IS NOT NULL THEN
+                    {added}
+                END IF;
+            END IF;
+
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """)
+    op.execute("""
+        CREATE TRIGGER mod_rating_update
+        AFTER INSERT OR UPDATE OF rating, mod_id OR DELETE ON review
+        FOR EACH ROW EXECUTE PROCEDURE mod_rating_update()
+        """)
+
+    # Backfill from existing reviews
+    histogram = ", ".join(
+        f"count(*) FILTER (WHERE {bucket.format('r')} = {star})" for star in range(1, 6)
+    )
+    op.execute(f"""
+        UPDATE mod SET
+            rating_sum = agg.rating_sum,
+            rating_count = agg.rating_count,
+            rating_avg = agg.rating_avg,
+            rating_histogram = agg.rating_histogram
+        FROM (
+            SELECT
+                mod_id,
+                sum(r.rating) AS rating_sum,
+                count(r.rating) AS rating_count,
+                avg(r.rating) AS rating_avg,
+                ARRAY[{histogram}]::int[] AS rating_histogram
+            FROM review r
+            WHERE r.rating IS NOT NULL
+            GROUP BY mod_id
+        ) agg
+        WHERE mod.id = agg.mod_id
+        """)
+
+
+def downgrade():
+    op.execute("DROP TRIGGER mod_rating_update ON review")
+    op.execute("DROP FUNCTION mod_rating_update()")
+    op.drop_index(op.f("ix_mod_rating_avg_id"), table_name="mod")
+    op.drop_column("mod", "rating_histogram")
+    op.drop_column("mod", "rating_avg")
+    op.drop_column("mod", "rating_count")
+    op.drop_column("mod", "rating_sum")
@@ -0,0 +1,77 @@
+# flake8: noqa: E128
+"""
+Review reaction trigger
+
+Revision ID: 9c4e2a7b5d16
+Revises: 5a2f9c1d7e48
+Create Date: 2020-03-02 10:37:18.402659+00:00
+"""
+
+# External Libraries
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "9c4e2a7b5d16"
+down_revision = "5a2f9c1d7e48"
+branch_labels = None
+depends_on = None
+
+adjust_counters = """
+    UPDATE review SET
+        upvote_count = upvote_count {op} ({row}.reaction = 'upvote')::int,
+        downvote_count = downvote_count {op} ({row}.reaction = 'downvote')::int,
+        funny_count = funny_count {op} ({row}.reaction = 'funny')::int,
+        score = score {op} ({row}.reaction = 'upvote')::int
+            {inverse} ({row}.reaction = 'downvote')::int
+    WHERE id = {row}.review_id;
+"""
+
+
+def upgrade():
+    removed = adjust_counters.format(op="-", inverse="+", row="OLD")
+    added = adjust_counters.format(op="+", inverse="-", row="NEW")
+    op.execute(f"""
+        CREATE FUNCTION review_reaction_update() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                {removed}
+            END IF;
+
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                {added}
+            END IF;
+
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """)
+    op.execute("""
+        CREATE TRIGGER review_reaction_update
+        AFTER INSERT OR UPDATE OF reaction, review_id OR DELETE ON review_reaction
+        FOR EACH ROW EXECUTE PROCEDURE review_reaction_update()
+        """)
+
+    # Counters drifted whenever reactions were deleted along with their user.
+    op.execute("""
+        UPDATE review SET
+            upvote_count = agg.upvote_count,
+            downvote_count = agg.downvote_count,
+            funny_count = agg.funny_count,
+            score = agg.upvote_count - agg.downvote_count
+        FROM (
+            SELECT
+                r.id,
+                count(rr.id) FILTER (WHERE rr.reaction = 'upvote') AS upvote_count,
+                count(rr.id) FILTER (WHERE rr.reaction = 'downvote') AS downvote_count,
+                count(rr.id) FILTER (WHERE rr.reaction = 'funny') AS funny_count
+            FROM review r
+            LEFT JOIN review_reaction rr ON rr.review_id = r.id
+            GROUP BY r.id
+        ) agg
+        WHERE review.id = agg.id
+        """)
+
+
+def downgrade():
+    op.execute("DROP TRIGGER review_reaction_update ON review_reaction")
+    op.execute("DROP FUNCTION review_reaction_update()")
@@ -0,0 +1,45 @@
+# flake8: noqa: E128
+"""
+Keyset indexes
+
+Revision ID: a853be39b7a1
+Revises: 036654a8416f
+Create Date: 2020-02-09 11:32:17.845120+00:00
+"""
+
+# External Libraries
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "a853be39b7a1"
+down_revision = "036654a8416f"
+branch_labels = None
+depends_on = None
+
+# Every listing sort is followed by the id, so cursors can seek straight to their row.
+indexes = {
+    "mod": [
+        ["title", "id"],
+        ["last_updated", "id"],
+        ["released_at", "id"],
+        ["downloads", "id"],
+    ],
+    "user": [["username", "id"], ["created_at", "id"]],
+    "review": [["mod_id", "created_at", "id"], ["mod_id", "rating", "id"]],
+}
+
+
+def index_name(table, columns):
+    return op.f(f"ix_{table}_{'_'.join(columns)}")
+
+
+def upgrade():
+    for table, column_sets in indexes.items():
+        for columns in column_sets:
+            op.create_index(index_name(table, columns), table, columns)
+
+
+def downgrade():
+    for table, column_sets in indexes.items():
+        for columns in column_sets:
+            op.drop_index(index_name(table, columns), table_name=table)
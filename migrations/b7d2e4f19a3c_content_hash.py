@@ -0,0 +1,38 @@
+# flake8: noqa: E128
+"""
+Content hash index
+
+Revision ID: b7d2e4f19a3c
+Revises: 530e3dafdbeb
+Create Date: 2020-02-21 14:12:08.530917+00:00
+"""
+
+# External Libraries
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "b7d2e4f19a3c"
+down_revision = "530e3dafdbeb"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "content_hash",
+        sa.Column("id", sa.Unicode(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("sha256", sa.Unicode(length=64), nullable=False),
+        sa.Column("ipfs_hash", sa.Unicode(), nullable=False),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_content_hash")),
+        sa.UniqueConstraint("sha256", name=op.f("uq_content_hash_sha256")),
+    )
+    op.create_index(
+        op.f("ix_content_hash_ipfs_hash"), "content_hash", ["ipfs_hash"], unique=False
+    )
+
+
+def downgrade():
+    op.drop_index(op.f("ix_content_hash_ipfs_hash"), table_name="content_hash")
+    op.drop_table("content_hash")
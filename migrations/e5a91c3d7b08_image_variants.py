@@ -0,0 +1,31 @@
+# flake8: noqa: E128
+"""
+Image variants
+
+Revision ID: e5a91c3d7b08
+Revises: b7d2e4f19a3c
+Create Date: 2020-02-23 11:47:32.196208+00:00
+"""
+
+# External Libraries
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+
+# revision identifiers, used by Alembic.
+revision = "e5a91c3d7b08"
+down_revision = "b7d2e4f19a3c"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("mod", sa.Column("icon_variants", JSONB(), nullable=True))
+    op.add_column("mod", sa.Column("banner_variants", JSONB(), nullable=True))
+    op.add_column("media", sa.Column("variants", JSONB(), nullable=True))
+
+
+def downgrade():
+    op.drop_column("media", "variants")
+    op.drop_column("mod", "banner_variants")
+    op.drop_column("mod", "icon_variants")
@@ -1,4 +1,5 @@
 # Stdlib
+import asyncio
 import base64
 from enum import Enum
 import inspect
@@ -7,14 +8,30 @@ from typing import List
 # External Libraries
 from Cryptodome.Cipher import AES
 from marshmallow_enum import EnumField
-from quart import abort, jsonify, request
+from quart import abort, request
 from sqlalchemy import and_
-from webargs import fields
+from webargs import fields, validate
 
 # Sayonika Internals
 from framework.authentication import Authenticator
 from framework.models import Mod, User, Report, ModAuthor, AuthorRole, UserReport
-from framework.objects import SETTINGS, db
+from framework.objects import (
+    SETTINGS,
+    db,
+    limiter,
+    metrics,
+    trending,
+    news_feed,
+    mail_outbox,
+    token_cache,
+    hashing_pool,
+    content_index,
+    total_counter,
+    thumbnail_pool,
+    query_monitor,
+    response_cache,
+    download_counter,
+)
 from framework.quart_webargs import use_kwargs
 from framework.route import route, multiroute
 from framework.route_wrappers import json, requires_admin, requires_developer
@@ -111,18 +128,26 @@ class Admin(RouteCog):
             sort_by.asc() if ascending else sort_by.desc()
         )
 
-        results = await paginate(query, page, limit).gino.all()
-        total = (
-            await Mod.query.where(
-                Mod.verified == False  # noqa: E712 pylint: disable=singleton-comparison
-            )
-            .alias()
-            .count()
-            .gino.scalar()
+        results, (total, estimated) = await asyncio.gather(
+            paginate(query, page, limit).gino.all(),
+            total_counter.count(
+                "verify_queue",
+                Mod.query.where(
+                    Mod.verified
+                    == False  # noqa: E712 pylint: disable=singleton-comparison
+                ),
+                {},
+            ),
         )
         results = self.deep_dict_all(results)
 
-        return jsonify(total=total, page=page, limit=limit, results=results)
+        return {
+            "total": total,
+            "total_estimated": estimated,
+            "page": page,
+            "limit": limit,
+            "results": results,
+        }
 
     @route("/api/v1/mods/report_queue", methods=["GET"])
     @requires_admin
@@ -142,7 +167,7 @@ class Admin(RouteCog):
             Report.query.order_by("mod_id"), page, limit
         ).gino.all()
 
-        return jsonify(self.dict_all(reports))
+        return self.dict_all(reports)
 
     @route("/api/v1/mods/<mod_id>/verify", methods=["POST"])
     @requires_admin
@@ -152,8 +177,9 @@ class Admin(RouteCog):
             abort(404, "Unknown mod")
 
         await Mod.update.values(verified=True).where(Mod.id == mod_id).gino.status()
+        await response_cache.invalidate("mods")
 
-        return jsonify(True)
+        return True
 
     @route("/api/v1/admin/decrypt_tb", methods=["POST"])
     @requires_admin
@@ -172,7 +198,7 @@ class Admin(RouteCog):
         c = AES.new(SETTINGS["AES_KEY"], AES.MODE_CTR, nonce=nonce)
         parsed = c.decrypt(digest).decode()
 
-        return jsonify(parsed)
+        return parsed
 
     @multiroute(
         "/api/v1/admin/users/<user_id>", methods=["PATCH"], other_methods=["DELETE"]
@@ -198,17 +224,18 @@ class Admin(RouteCog):
 
         user = await User.get(admin_user_id)
 
-        if not Authenticator.compare_password(password, user.password):
+        if not await Authenticator.compare_password(password, user.password):
             abort(401, "Invalid password")
 
         if not kwargs:
-            return jsonify(True)
+            return True
 
         await User.update.values(
             **{k: v for k, v in kwargs.items() if v is not None}
         ).where(User.id == user_id).gino.status()
+        await token_cache.invalidate(user_id)
 
-        return jsonify(True)
+        return True
 
     @route("/api/v1/admin/users/report_queue", methods=["GET"])
     @requires_admin
@@ -228,7 +255,7 @@ class Admin(RouteCog):
             UserReport.query.order_by("user_id"), page, limit
         ).gino.all()
 
-        return jsonify(self.dict_all(reports))
+        return self.dict_all(reports)
 
     @multiroute(
         "/api/v1/admin/users/<user_id>", methods=["DELETE"], other_methods=["PATCH"]
@@ -245,7 +272,7 @@ class Admin(RouteCog):
 
         user = await User.get(admin_user_id)
 
-        if not Authenticator.compare_password(password, user.password):
+        if not await Authenticator.compare_password(password, user.password):
             abort(401, "Invalid password")
 
         await Mod.delete.where(
@@ -256,8 +283,50 @@ class Admin(RouteCog):
             )
         ).gino.status()
         await User.delete.where(User.id == user_id).gino.status()
+        await token_cache.invalidate(user_id)
+        await response_cache.invalidate("mods")
 
-        return jsonify(True)
+        return True
+
+    @route("/api/v1/admin/mail", methods=["GET"])
+    @requires_admin
+    @json
+    @use_kwargs(
+        {"limit": fields.Int(missing=100, validate=validate.Range(1, 1000))},
+        locations=("query",),
+    )
+    async def get_mail(self, limit: int):
+        """Outbox lengths, along with the latest mail that couldn't be sent."""
+        return {
+            **await mail_outbox.lengths(),
+            "dead_letters": await mail_outbox.dead_letters(limit),
+        }
+
+    @route("/api/v1/admin/mail/dead_letters/requeue", methods=["POST"])
+    @requires_admin
+    @json
+    async def requeue_dead_mail(self):
+        return {"requeued": await mail_outbox.requeue_dead()}
+
+    @route("/api/v1/admin/stats", methods=["GET"])
+    @requires_developer
+    @json
+    async def get_stats(self):
+        """Internal counters of this worker, for keeping an eye on caches."""
+        return {
+            "token_cache": token_cache.stats(),
+            "hashing_pool": hashing_pool.stats(),
+            "response_cache": response_cache.stats(),
+            "content_index": content_index.stats(),
+            "thumbnail_pool": thumbnail_pool.stats(),
+            "download_counter": download_counter.stats(),
+            "trending": trending.stats(),
+            "limiter": limiter.stats(),
+            "news_feed": news_feed.stats(),
+            "mail_outbox": mail_outbox.stats(),
+            "metrics": metrics.stats(),
+            "query_monitor": query_monitor.stats(),
+        }
 
 
 def setup(core: Sayonika):
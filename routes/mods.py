@@ -9,11 +9,13 @@ from typing import List, Tuple, Union, Optional
 from marshmallow import Schema
 from marshmallow_enum import EnumField
 from marshmallow_union import Union as UnionField
-from quart import abort, jsonify
-from sqlalchemy import and_, func, select
+from quart import abort, request
+from sqlalchemy import and_
+from sqlalchemy.dialects.postgresql import insert
 from webargs import fields, validate
 
 # Sayonika Internals
+from framework.identity import get_request_user
 from framework.models import (
     Mod,
     User,
@@ -27,24 +29,43 @@ from framework.models import (
     ReportType,
     ModCategory,
     ReactionType,
-    UserFavorite,
     EditorsChoice,
     ModPlaytester,
     ReviewReaction,
     MediaType,
 )
-from framework.objects import db, limiter
+from framework.objects import (
+    db,
+    ipfs,
+    limiter,
+    trending,
+    ingest_queue,
+    total_counter,
+    response_cache,
+    download_counter,
+)
+from framework.query_stats import query_budget
 from framework.quart_webargs import use_kwargs
 from framework.route import route, multiroute
-from framework.route_wrappers import json, requires_login, requires_supporter
+from framework.route_wrappers import (
+    json,
+    cached,
+    requires_login,
+    requires_supporter,
+)
 from framework.routecog import RouteCog
 from framework.sayonika import Sayonika
+from framework.thumbnails import VARIANTS
+from framework.uploads import ImageUpload
 from framework.utils import (
     paginate,
+    next_cursor,
+    keyset_order,
+    in_background,
     get_token_user,
     generalize_text,
+    keyset_paginate,
     verify_recaptcha,
-    ipfs_upload,
 )
 
 
@@ -116,18 +137,25 @@ ACCEPTED_MIMETYPES = ("image/png", "image/jpeg", "image/webp")
 DATA_URI_RE = re.compile(r"data:([a-z]+/[a-z-.+]+);base64,([a-zA-Z0-9/+]+=*)")
 mod_sorters = {
     ModSorting.title: Mod.title,
-    # ModSorting.rating: lambda ascending:
+    ModSorting.rating: Mod.rating_avg,
     ModSorting.last_updated: Mod.last_updated,
     ModSorting.release_date: Mod.released_at,
     ModSorting.downloads: Mod.downloads,
 }
 
-# Best and funniest handled separately
+opposite_reactions = {
+    ReactionType.upvote: ReactionType.downvote,
+    ReactionType.downvote: ReactionType.upvote,
+}
+
+# Values are the column and whether it's ascending.
 review_sorters = {
-    ReviewSorting.newest: Review.created_at,
-    ReviewSorting.oldest: Review.created_at.asc(),
-    ReviewSorting.highest: Review.rating,
-    ReviewSorting.lowest: Review.rating.asc(),
+    ReviewSorting.best: (Review.score, False),
+    ReviewSorting.funniest: (Review.funny_count, False),
+    ReviewSorting.newest: (Review.created_at, False),
+    ReviewSorting.oldest: (Review.created_at, True),
+    ReviewSorting.highest: (Review.rating, False),
+    ReviewSorting.lowest: (Review.rating, True),
 }
 
 
@@ -144,10 +172,14 @@ def b64img_field(name: str):
     )
 
 
+def variant_field():
+    return fields.Str(validate=validate.OneOf(list(VARIANTS)))
+
+
 class Mods(RouteCog):
     @staticmethod
-    def dict_all(models):
-        return [m.to_dict() for m in models]
+    def dict_all(models, **kwargs):
+        return [m.to_dict(**kwargs) for m in models]
 
     @multiroute("/api/v1/mods", methods=["GET"], other_methods=["POST"])
     @json
@@ -155,12 +187,14 @@ class Mods(RouteCog):
         {
             "q": fields.Str(),
             "page": fields.Int(missing=0),
+            "cursor": fields.Str(),
             "limit": fields.Int(missing=50),
             "category": EnumField(ModCategory),
             "rating": fields.Int(validate=validate.OneOf([1, 2, 3, 4, 5])),
             "status": EnumField(ModStatus),
             "sort": EnumField(ModSorting),
             "ascending": fields.Bool(missing=False),
+            "variant": variant_field(),
         },
         locations=("query",),
     )
@@ -168,12 +202,14 @@ class Mods(RouteCog):
         self,
         q: str = None,
         page: int = None,
+        cursor: str = None,
         limit: int = None,
         category: ModCategory = None,
         rating: int = None,
         status: ModStatus = None,
         sort: ModSorting = None,
         ascending: bool = None,
+        variant: str = None,
     ):
         if not 1 <= limit <= 100:
             limit = max(
@@ -184,44 +220,57 @@ class Mods(RouteCog):
         query = Mod.query.where(Mod.verified)
 
         if q is not None:
-            like = f"%{q}%"
-
-            query = query.where(
-                and_(
-                    Mod.title.match(q),
-                    Mod.tagline.match(q),
-                    Mod.description.match(q),
-                    Mod.title.ilike(like),
-                    Mod.tagline.ilike(like),
-                    Mod.description.ilike(like),
-                )
-            )
+            query = query.where(Mod.search_filter(q))
 
         if category is not None:
             query = query.where(Mod.status == category)
 
         if rating is not None:
             query = query.where(
-                rating + 1
-                > db.select(
-                    [func.avg(Review.select("rating").where(Review.mod_id == Mod.id))]
-                )
-                >= rating
+                and_(Mod.rating_avg >= rating, Mod.rating_avg < rating + 1)
             )
 
         if status is not None:
             query = query.where(Mod.status == status)
 
-        if sort is not None:
-            sort_by = mod_sorters[sort]
-            query = query.order_by(sort_by.asc() if ascending else sort_by.desc())
+        sort_by = mod_sorters[sort] if sort is not None else None
+        # Searches without an explicit sort are ordered by relevance instead.
+        by_relevance = q is not None and sort is None
 
-        results = await paginate(query, page, limit).gino.all()
-        total = await query.alias().count().gino.scalar()
+        if cursor is not None and by_relevance:
+            abort(400, "`cursor` needs a `sort` when searching")
 
-        return jsonify(
-            total=total, page=page, limit=limit, results=self.dict_all(results)
-        )
+        # Count alongside fetching the page, rather than after it.
+        async with in_background(
+            total_counter.count(
+                "mods",
+                query,
+                dict(q=q, category=category, rating=rating, status=status),
+            )
+        ) as total_task:
+            if cursor is not None:
+                results, next_ = await keyset_paginate(
+                    query, sort_by, Mod.id, cursor, limit, ascending
+                )
+            elif by_relevance:
+                ordered = query.order_by(Mod.search_rank(q).desc())
+                results = await paginate(ordered, page, limit).gino.all()
+                next_ = None
+            else:
+                ordered = keyset_order(query, sort_by, Mod.id, ascending)
+                results = await paginate(ordered, page, limit).gino.all()
+                next_ = next_cursor(results, sort_by, limit)
+
+            total, estimated = await total_task
+
+        return {
+            "total": total,
+            "total_estimated": estimated,
+            "page": page,
+            "limit": limit,
+            "next_cursor": next_,
+            "results": self.dict_all(results, variant=variant),
+        }
 
     @multiroute("/api/v1/mods", methods=["POST"], other_methods=["GET"])
     @requires_login
@@ -247,6 +296,7 @@ class Mods(RouteCog):
         },
         locations=("json",),
     )
+    @query_budget(10)
     async def post_mods(
         self,
         title: str,
@@ -292,15 +342,18 @@ class Mods(RouteCog):
             theme_color=color,
         )
 
-        icon_mimetype, icon_data = validate_img(icon, "icon")
-        banner_mimetype, banner_data = validate_img(banner, "banner")
+        icon = validate_img(icon, "icon")
+        banner = validate_img(banner, "banner")
         media = [validate_img(x, "media") for x in media]
 
-        for i, author in enumerate(authors):
-            if author["id"] == user_id:
-                authors.pop(i)
-                continue
-            elif not await User.exists(author["id"]):
+        authors = [author for author in authors if author["id"] != user_id]
+        # Authors and playtesters are checked together, to only need one query.
+        missing = await User.exists_many(
+            [author["id"] for author in authors] + (mod_playtester or [])
+        )
+
+        for author in authors:
+            if author["id"] in missing:
                 abort(400, f"Unknown user '{author['id']}'")
 
         authors.append({"id": user_id, "role": AuthorRole.owner})
@@ -313,56 +366,53 @@ class Mods(RouteCog):
                 abort(400, "No need for `ModPlaytester` if open beta")
 
             for playtester in mod_playtester:
-                if not await User.exists(playtester):
+                if playtester in missing:
                     abort(400, f"Unknown user '{playtester}'")
 
-        # Decode images and add name for mimetypes
-        icon_data = base64.b64decode(icon_data)
-        banner_data = base64.b64decode(banner_data)
-        icon_ext = icon_mimetype.split("/")[1]
-        banner_ext = banner_mimetype.split("/")[1]
-
-        icon_resp = await ipfs_upload(
-            icon_data, f"icon.{icon_ext}", self.core.aioh_sess
-        )
-        banner_resp = await ipfs_upload(
-            banner_data, f"banner.{banner_ext}", self.core.aioh_sess
-        )
-
-        mod.icon = icon_resp["Hash"]
-        mod.banner = banner_resp["Hash"]
+        async with db.transaction():
+            await mod.create()
+            await ModAuthor.insert().gino.all(
+                *[
+                    dict(user_id=author["id"], mod_id=mod.id, role=author["role"])
+                    for author in authors
+                ]
+            )
 
-        media_hashes = []
-        for mime, data in media:
-            ext = mime.split("/")[1]
-            resp = await ipfs_upload(data, f"media.{ext}", self.core.aioh_sess)
+            if mod_playtester:
+                await ModPlaytester.insert().gino.all(
+                    *[dict(user_id=user, mod_id=mod.id) for user in mod_playtester]
+                )
 
-            media_hashes += [resp]
+            # Media rows are filled in with their hash once uploaded.
+            media_ids = []
 
-        await mod.create()
-        await ModAuthor.insert().gino.all(
-            *[
-                dict(user_id=author["id"], mod_id=mod.id, role=author["role"])
-                for author in authors
-            ]
-        )
-        await ModPlaytester.insert().gino.all(
-            *[dict(user_id=user, mod_id=mod.id) for user in mod_playtester]
-        )
+            if media:
+                media_ids = await (
+                    Media.insert()
+                    .values([dict(type=MediaType.image, mod_id=mod.id) for _ in media])
+                    .returning(Media.id)
+                    .gino.all()
+                )
 
-        if media_hashes:
-            await Media.insert().gino.all(
-                *[
-                    dict(type=MediaType.image, hash=hash_, mod_id=mod.id)
-                    for hash_ in media_hashes
-                ]
+        # Images get uploaded in the background, see `get_ingest_status` for progress.
+        for name, (mimetype, data), media_id in [
+            ("icon", icon, None),
+            ("banner", banner, None),
+            *(("media", x, y) for x, (y,) in zip(media, media_ids)),
+        ]:
+            await ingest_queue.enqueue(
+                mod.id, name, data, f"{name}.{mimetype.split('/')[1]}", media_id
             )
 
-        return jsonify(mod.to_dict())
+        await response_cache.invalidate("mods")
+
+        return mod.to_dict()
 
     @route("/api/v1/mods/recent_releases")
+    @cached("mods")
     @json
-    async def get_recent_releases(self):
+    @use_kwargs({"variant": variant_field()}, locations=("query",))
+    async def get_recent_releases(self, variant: str = None):
         mods = (
             await Mod.query.where(and_(Mod.verified, Mod.status == ModStatus.released))
             .order_by(Mod.released_at.desc())
@@ -370,21 +420,27 @@ class Mods(RouteCog):
             .gino.all()
         )
 
-        return jsonify(self.dict_all(mods))
+        return self.dict_all(mods, variant=variant)
 
     @route("/api/v1/mods/most_loved")
+    @cached("mods")
     @json
-    async def get_most_loved(self):
-        love_counts = (
-            select([func.count()]).where(UserFavorite.mod_id == Mod.id).as_scalar()
+    @use_kwargs({"variant": variant_field()}, locations=("query",))
+    async def get_most_loved(self, variant: str = None):
+        mods = (
+            await Mod.query.where(Mod.verified)
+            .order_by(Mod.favorite_count.desc(), Mod.id.desc())
+            .limit(10)
+            .gino.all()
         )
-        mods = await Mod.query.order_by(love_counts.desc()).limit(10).gino.all()
 
-        return jsonify(self.dict_all(mods))
+        return self.dict_all(mods, variant=variant)
 
     @route("/api/v1/mods/most_downloads")
+    @cached("mods")
     @json
-    async def get_most_downloads(self):
+    @use_kwargs({"variant": variant_field()}, locations=("query",))
+    async def get_most_downloads(self, variant: str = None):
         mods = (
             await Mod.query.where(and_(Mod.verified, Mod.released_at is not None))
             .order_by(Mod.downloads.desc())
@@ -392,17 +448,24 @@ class Mods(RouteCog):
             .gino.all()
         )
 
-        return jsonify(self.dict_all(mods))
+        return self.dict_all(mods, variant=variant)
 
     @route("/api/v1/mods/trending")
     @json
-    async def get_trending(self):
-        # TODO: implement
-        return jsonify([])
+    @use_kwargs({"variant": variant_field()}, locations=("query",))
+    async def get_trending(self, variant: str = None):
+        mod_ids = await trending.get(10)
+        mods = await Mod.query.where(and_(Mod.verified, Mod.id.in_(mod_ids))).gino.all()
+        # Keeps the order from the ranking.
+        mods.sort(key=lambda x: mod_ids.index(x.id))
+
+        return self.dict_all(mods, variant=variant)
 
     @route("/api/v1/mods/editors_choice")
+    @cached("mods")
     @json
-    async def get_ec(self):
+    @use_kwargs({"variant": variant_field()}, locations=("query",))
+    async def get_ec(self, variant: str = None):
         mod_ids = [x.mod_id for x in await EditorsChoice.query.gino.all()]
         mods = (
             await Mod.query.where(Mod.id in mod_ids)
@@ -410,11 +473,12 @@ class Mods(RouteCog):
             .limit(10)
             .gino.all()
         )
-        return jsonify(mods)
+        return self.dict_all(mods, variant=variant)
 
     @multiroute(
         "/api/v1/mods/<mod_id>", methods=["GET"], other_methods=["PATCH", "DELETE"]
     )
+    @cached("mods")
     @json
     async def get_mod(self, mod_id: str):
         # mod = await Mod.get(mod_id)
@@ -427,7 +491,7 @@ class Mods(RouteCog):
         if mod is None:
             abort(404, "Unknown mod")
 
-        return jsonify(mod.to_dict())
+        return mod.to_dict()
 
     @multiroute(
         "/api/v1/mods/<mod_id>", methods=["PATCH"], other_methods=["GET", "DELETE"]
@@ -467,6 +531,7 @@ class Mods(RouteCog):
         },
         locations=("json",),
     )
+    @query_budget(9)
     async def patch_mod(
         self,
         mod_id: str = None,
@@ -476,69 +541,72 @@ class Mods(RouteCog):
         banner: str = None,
         **kwargs,
     ):
-        if not await Mod.exists(mod_id):
+        mod = await Mod.get(mod_id)
+
+        if mod is None:
             abort(404, "Unknown mod")
 
-        mod = await Mod.get(mod_id)
         updates = mod.update(**kwargs)
+        authors = authors or []
+        mod_playtester = mod_playtester or []
+        # Everyone is checked at once, so this takes the same queries for any amount.
+        missing = await User.exists_many(
+            [author["id"] for author in authors] + mod_playtester
+        )
 
-        if authors is not None:
-            authors = [author for author in authors if await User.exists(author["id"])]
+        if authors:
             # TODO: if user is owner or co-owner, allow them to change the role of others to ones below them.
+            existing = await ModAuthor.find_existing(
+                "user_id", [author["id"] for author in authors], mod_id=mod.id
+            )
             authors = [
                 author
                 for author in authors
-                if not await ModAuthor.query.where(
-                    and_(ModAuthor.user_id == author["id"], ModAuthor.mod_id == mod_id)
-                ).gino.first()
+                if author["id"] not in missing and author["id"] not in existing
             ]
 
-        if mod_playtester is not None:
+        if mod_playtester:
+            enrolled = await ModPlaytester.find_existing(
+                "user_id", mod_playtester, mod_id=mod.id
+            )
+
             for playtester in mod_playtester:
-                if not await User.exists(playtester):
+                if playtester in missing:
                     abort(400, f"Unknown user '{playtester}'")
-                elif await ModPlaytester.query.where(
-                    and_(
-                        ModPlaytester.user_id == playtester,
-                        ModPlaytester.mod_id == mod.id,
-                    )
-                ).gino.all():
+                elif playtester in enrolled:
                     abort(400, f"{playtester} is already enrolled.")
 
-        if icon is not None:
-            icon_mimetype, icon_data = validate_img(icon, "icon")
-            icon_data = base64.b64decode(icon_data)
+        images = {
+            name: validate_img(value, name)
+            for name, value in (("icon", icon), ("banner", banner))
+            if value is not None
+        }
 
-            icon_ext = icon_mimetype.split("/")[1]
-            icon_resp = await ipfs_upload(
-                icon_data, f"icon.{icon_ext}", self.core.aioh_sess
-            )
+        async with db.transaction():
+            await updates.apply()
 
-            updates = updates.update(icon=icon_resp["Hash"])
+            if authors:
+                await ModAuthor.insert().gino.all(
+                    *[
+                        dict(user_id=author["id"], mod_id=mod.id, role=author["role"])
+                        for author in authors
+                    ]
+                )
 
-        if banner is not None:
-            banner_mimetype, banner_data = validate_img(banner, "banner")
-            banner_data = base64.b64decode(banner_data)
+            if mod_playtester:
+                await ModPlaytester.insert().gino.all(
+                    *[dict(user_id=user, mod_id=mod.id) for user in mod_playtester]
+                )
 
-            banner_ext = banner_mimetype.split("/")[1]
-            banner_resp = await ipfs_upload(
-                banner_data, f"banner.{banner_ext}", self.core.aioh_sess
+        # Images get uploaded in the background, see `get_ingest_status` for progress.
+        for name, (mimetype, data) in images.items():
+            await ingest_queue.enqueue(
+                mod.id, name, data, f"{name}.{mimetype.split('/')[1]}"
             )
 
-            updates = updates.update(banner=banner_resp["Hash"])
+        await response_cache.invalidate("mods")
 
-        await updates.apply()
-        await ModAuthor.insert().gino.all(
-            *[
-                dict(user_id=author["id"], mod_id=mod.id, role=author["role"])
-                for author in authors
-            ]
-        )
-        await ModPlaytester.insert().gino.all(
-            *[dict(user_id=user, mod_id=mod.id) for user in ModPlaytester]
-        )
-
-        return jsonify(mod.to_dict())
+        return mod.to_dict()
 
     # TODO: decline route with reason, maybe doesn't 100% delete it? idk
     @multiroute(
@@ -548,8 +616,9 @@ class Mods(RouteCog):
     @json
     async def delete_mod(self, mod_id: str):
         await Mod.delete.where(Mod.id == mod_id).gino.status()
+        await response_cache.invalidate("mods")
 
-        return jsonify(True)
+        return True
 
     @route("/api/v1/mods/<mod_id>/download")
     @json
@@ -562,14 +631,98 @@ class Mods(RouteCog):
             abort(404, "Unknown mod")
         if user_id is None and mod.is_private_beta:
             abort(403, "Private beta mods requires authentication.")
-        if not await ModPlaytester.query.where(
-            and_(ModPlaytester.user_id == user_id, ModPlaytester.mod_id == mod.id)
-        ).gino.all():
+        if (
+            mod.is_private_beta
+            and not await ModPlaytester.query.where(
+                and_(ModPlaytester.user_id == user_id, ModPlaytester.mod_id == mod.id)
+            ).gino.all()
+        ):
             abort(403, "You are not enrolled to the private beta.")
-        elif not mod.zip_url:
+        elif not mod.download_url:
             abort(404, "Mod has no download")
 
-        return jsonify(url=mod.zip_url)
+        # Counted in Redis and written to `downloads` in batches, see `DownloadCounter`.
+        await download_counter.record(mod.id, user_id or request.remote_addr)
+
+        return {"url": mod.download_url}
+
+    async def upload_image(self, mod_id: str, name: str) -> str:
+        """Streams an image from the request body to IPFS, returning its hash."""
+        if not await Mod.exists(mod_id):
+            abort(404, "Unknown mod")
+
+        upload = ImageUpload(name)
+        await upload.start()
+
+        try:
+            resp = await ipfs.upload_stream(
+                upload.chunks(), upload.filename, self.core.aioh_sess
+            )
+        except Exception:
+            if upload.error is not None:
+                abort(*upload.error)
+
+            raise
+
+        return resp["Hash"]
+
+    @route("/api/v1/mods/<mod_id>/icon", methods=["PUT"])
+    @requires_login
+    @json
+    async def put_icon(self, mod_id: str):
+        icon = await self.upload_image(mod_id, "icon")
+        mod = await Mod.get(mod_id)
+
+        await mod.update(icon=icon, icon_variants=None).apply()
+        await ingest_queue.enqueue_variants(mod_id, "icon", icon)
+        await response_cache.invalidate("mods")
+
+        return mod.to_dict()
+
+    @route("/api/v1/mods/<mod_id>/banner", methods=["PUT"])
+    @requires_login
+    @json
+    async def put_banner(self, mod_id: str):
+        banner = await self.upload_image(mod_id, "banner")
+        mod = await Mod.get(mod_id)
+
+        await mod.update(banner=banner, banner_variants=None).apply()
+        await ingest_queue.enqueue_variants(mod_id, "banner", banner)
+        await response_cache.invalidate("mods")
+
+        return mod.to_dict()
+
+    @route("/api/v1/mods/<mod_id>/media", methods=["POST"])
+    @requires_login
+    @json
+    async def post_media(self, mod_id: str):
+        hash_ = await self.upload_image(mod_id, "media")
+        media = await Media.create(type=MediaType.image, hash=hash_, mod_id=mod_id)
+
+        await ingest_queue.enqueue_variants(mod_id, "media", hash_, media.id)
+        await response_cache.invalidate("mods")
+
+        return media.to_dict()
+
+    @route("/api/v1/mods/<mod_id>/ingest_status")
+    @requires_login
+    @json
+    async def get_ingest_status(self, mod_id: str):
+        if not await Mod.exists(mod_id):
+            abort(404, "Unknown mod")
+
+        user = await get_request_user()
+
+        # `requires_login` only checks authorship for methods other than GET.
+        if not (user.developer or user.moderator) and not await ModAuthor.find_existing(
+            "user_id", [user.id], mod_id=mod_id
+        ):
+            abort(
+                403,
+                "User does not have the required permissions to fulfill the request.",
+            )
+
+        return await ingest_queue.status(mod_id)
 
     @multiroute(
         "/api/v1/mods/<mod_id>/reviews", methods=["GET"], other_methods=["POST"]
@@ -578,6 +731,7 @@ class Mods(RouteCog):
     @use_kwargs(
         {
             "page": fields.Int(missing=0),
+            "cursor": fields.Str(),
             "limit": fields.Int(missing=10),
             "rating": UnionField(
                 [
@@ -597,6 +751,7 @@ class Mods(RouteCog):
         limit: int,
         rating: Union[int, str],
         sort: ReviewSorting,
+        cursor: str = None,
     ):
         if not await Mod.exists(mod_id):
             abort(404, "Unknown mod")
@@ -608,96 +763,7 @@ class Mods(RouteCog):
 
         page = page - 1 if page > 0 else 0
 
-        upvote_aggregate = (
-            select([func.count()])
-            .where(
-                and_(
-                    ReviewReaction.review_id == Review.id,
-                    ReviewReaction.reaction == ReactionType.upvote,
-                )
-            )
-            .as_scalar()
-        )
-        downvote_aggregate = (
-            select([func.count()])
-            .where(
-                and_(
-                    ReviewReaction.review_id == Review.id,
-                    ReviewReaction.reaction == ReactionType.downvote,
-                )
-            )
-            .as_scalar()
-        )
-        funny_aggregate = (
-            select([func.count()])
-            .where(
-                and_(
-                    ReviewReaction.review_id == Review.id,
-                    ReviewReaction.reaction == ReactionType.funny,
-                )
-            )
-            .as_scalar()
-        )
-
-        query = Review.load(
-            author=User,
-            upvotes=upvote_aggregate,
-            downvotes=downvote_aggregate,
-            funnys=funny_aggregate,
-        ).where(Review.mod_id == mod_id)
-
-        user_id = await get_token_user()
-
-        if user_id:
-            did_upvote_q = (
-                select([func.count()])
-                .where(
-                    and_(
-                        ReviewReaction.review_id == Review.id,
-                        ReviewReaction.user_id == user_id,
-                        ReviewReaction.reaction == ReactionType.upvote,
-                    )
-                )
-                .limit(1)
-                .as_scalar()
-            )
-            did_downvote_q = (
-                select([func.count()])
-                .where(
-                    and_(
-                        ReviewReaction.review_id == Review.id,
-                        ReviewReaction.user_id == user_id,
-                        ReviewReaction.reaction == ReactionType.downvote,
-                    )
-                )
-                .limit(1)
-                .as_scalar()
-            )
-            did_funny_q = (
-                select([func.count()])
-                .where(
-                    and_(
-                        ReviewReaction.review_id == Review.id,
-                        ReviewReaction.user_id == user_id,
-                        ReviewReaction.reaction == ReactionType.funny,
-                    )
-                )
-                .limit(1)
-                .as_scalar()
-            )
-
-            query = query.gino.load(
-                user_reacted_upvote=did_upvote_q,
-                user_reacted_downvote=did_downvote_q,
-                user_reacted_funny=did_funny_q,
-            )
-
-        if review_sorters[sort]:
-            query = query.order_by(review_sorters[sort])
-        elif sort == ReviewSorting.best:
-            query = query.order_by(upvote_aggregate - downvote_aggregate)
-        elif sort == ReviewSorting.funniest:
-            query = query.order_by(funny_aggregate.desc())
+        conditions = [Review.mod_id == mod_id]
 
         if isinstance(rating, int):
             values = [rating, rating + 0.5]
@@ -706,14 +772,57 @@ class Mods(RouteCog):
                 # Also get reviews with a 0.5 star rating, otherwise they'll never appear.
                 values.append(0.5)
 
-            query = query.where(Review.rating.in_(values))
+            conditions.append(Review.rating.in_(values))
 
-        reviews = await paginate(query, page, limit).gino.all()
-        total = await query.alias().count().gino.scalar()
+        query = Review.outerjoin(User).select().where(and_(*conditions))
+        query = query.gino.load(Review.load(author=User)).query
+        sort_by, ascending = review_sorters[sort]
 
-        return jsonify(
-            total=total, page=page, limit=limit, results=self.dict_all(reviews)
-        )
+        async with in_background(
+            total_counter.count(
+                "reviews",
+                Review.query.where(and_(*conditions)),
+                dict(mod_id=mod_id, rating=rating),
+            )
+        ) as total_task:
+            if cursor is not None:
+                reviews, next_ = await keyset_paginate(
+                    query, sort_by, Review.id, cursor, limit, ascending
+                )
+            else:
+                ordered = keyset_order(query, sort_by, Review.id, ascending)
+                reviews = await paginate(ordered, page, limit).gino.all()
+                next_ = next_cursor(reviews, sort_by, limit)
+
+            user_id = await get_token_user()
+
+            if user_id and reviews:
+                reactions = (
+                    await ReviewReaction.select("review_id", "reaction")
+                    .where(
+                        and_(
+                            ReviewReaction.user_id == user_id,
+                            ReviewReaction.review_id.in_([x.id for x in reviews]),
+                        )
+                    )
+                    .gino.all()
+                )
+
+                for review in reviews:
+                    review.user_reactions = {
+                        reaction for id_, reaction in reactions if id_ == review.id
+                    }
+
+            total, estimated = await total_task
+
+        return {
+            "total": total,
+            "total_estimated": estimated,
+            "page": page,
+            "limit": limit,
+            "next_cursor": next_,
+            "results": self.dict_all(reviews),
+        }
 
     @multiroute(
         "/api/v1/mods/<mod_id>/reviews", methods=["POST"], other_methods=["GET"]
@@ -752,8 +861,9 @@ class Mods(RouteCog):
             author_id=user_id,
             mod_id=mod_id,
         )
+        await response_cache.invalidate("mods")
 
-        return jsonify(review.to_json())
+        return review.to_dict()
 
     @route("/api/v1/reviews/<review_id>/react", methods=["POST"])
     @requires_login
@@ -765,45 +875,48 @@ class Mods(RouteCog):
         }
     )
     async def react_review(self, review_id: str, undo: bool, type_: EnumField):
+        if not await Review.exists(review_id):
+            abort(404, "Unknown review")
+
         user_id = await get_token_user()
         where_opts = [
             ReviewReaction.review_id == review_id,
             ReviewReaction.user_id == user_id,
-            ReviewReaction.reaction == type_,
         ]
-        create_opts = {"review_id": review_id, "user_id": user_id, "reaction": type_}
 
-        exists = bool(
-            await ReviewReaction.select("id").where(and_(*where_opts)).gino.scalar()
-        )
+        if undo:
+            removed = [type_]
+        elif type_ in opposite_reactions:
+            # Negate any opposite vote, as upvoting and downvoting at the same time
+            # is stupid.
+            removed = [opposite_reactions[type_]]
+        else:
+            removed = []
 
-        if (exists and not undo) or (not exists and undo):
-            pass
-        elif not undo:
-            if type_ == ReactionType.upvote:
-                # Negate any downvotes by the user as upvoting and downvoting at the same time is stupid
-                await ReviewReaction.delete.where(
-                    and_(*where_opts[:-1], ReviewReaction.type == ReactionType.downvote)
-                ).gino.status()
-            elif type_ == ReactionType.downvote:
-                # Ditto for any upvotes if trying to downvote
+        # Review counters are kept up to date by a trigger on review_reaction.
+        async with db.transaction():
+            for reaction in removed:
                 await ReviewReaction.delete.where(
-                    and_(*where_opts[:-1], ReviewReaction.type == ReactionType.downvote)
+                    and_(*where_opts, ReviewReaction.reaction == reaction)
                 ).gino.status()
 
-            await ReviewReaction.create(**create_opts)
-        else:
-            await ReviewReaction.delete.where(and_(*where_opts)).gino.status()
+            if not undo:
+                await (
+                    insert(ReviewReaction.__table__)
+                    .values(review_id=review_id, user_id=user_id, reaction=type_)
+                    .on_conflict_do_nothing()
+                    .gino.status()
+                )
 
         # Return user's current reaction results
-        results = await ReviewReaction.query.where(and_(*where_opts[:-1])).gino.all()
+        results = await ReviewReaction.query.where(and_(*where_opts)).gino.all()
         results = [x.reaction for x in results]
 
-        return jsonify(
-            upvote=ReactionType.upvote in results,
-            downvote=ReactionType.downvote in results,
-            funny=ReactionType.funny in results,
-        )
+        return {
+            "upvote": ReactionType.upvote in results,
+            "downvote": ReactionType.downvote in results,
+            "funny": ReactionType.funny in results,
+        }
 
     # This handles POST requests to add zip_url.
     # Usually this would be done via a whole entry but this
@@ -846,7 +959,7 @@ class Mods(RouteCog):
             content=content, author_id=user_id, mod_id=mod_id, type=type_
         )
 
-        return jsonify(report.to_dict())
+        return report.to_dict()
 
 
 def setup(core: Sayonika):
@@ -4,7 +4,7 @@ from enum import Enum
 
 # External Libraries
 from marshmallow_enum import EnumField
-from quart import abort, jsonify
+from quart import abort
 from sqlalchemy import or_, not_
 from webargs import fields, validate
 
@@ -20,13 +20,28 @@ from framework.models import (
     UserFavorite,
     UserReportType,
 )
-from framework.objects import SETTINGS, mailer, limiter, jwt_service
+from framework.objects import (
+    SETTINGS,
+    limiter,
+    mail_outbox,
+    jwt_service,
+    token_cache,
+    total_counter,
+)
 from framework.quart_webargs import use_kwargs
 from framework.route import route, multiroute
 from framework.route_wrappers import json, requires_login
 from framework.routecog import RouteCog
 from framework.sayonika import Sayonika
-from framework.utils import paginate, get_token_user, verify_recaptcha
+from framework.utils import (
+    paginate,
+    next_cursor,
+    keyset_order,
+    in_background,
+    get_token_user,
+    keyset_paginate,
+    verify_recaptcha,
+)
 
 
 class UserSorting(Enum):
@@ -48,6 +63,7 @@ class Users(RouteCog):
         {
             "q": fields.Str(),
             "page": fields.Int(missing=0),
+            "cursor": fields.Str(),
             "limit": fields.Int(missing=50),
             "sort": EnumField(UserSorting),
             "ascending": fields.Bool(missing=False),
@@ -59,6 +75,7 @@ class Users(RouteCog):
         self,
         q: str = None,
         page: int = None,
+        cursor: str = None,
         limit: int = None,
         sort: UserSorting = None,
         ascending: bool = False,
@@ -77,20 +94,34 @@ class Users(RouteCog):
                 or_(User.username.match(q), User.username.ilike(f"%{q}%"))
             )
 
-        if sort is not None:
-            sort_by = sorters[sort]
-            query = query.order_by(sort_by.asc() if ascending else sort_by.desc())
-
         if ignore is not None:
             ignore = ignore.split(",")
             query = query.where(not_(User.id.in_(ignore)))
 
-        results = await paginate(query, page, limit).gino.all()
-        total = await query.alias().count().gino.scalar()
-
-        return jsonify(
-            total=total, page=page, limit=limit, results=self.dict_all(results)
-        )
+        sort_by = sorters[sort] if sort is not None else None
+
+        async with in_background(
+            total_counter.count("users", query, dict(q=q, ignore=ignore), "user")
+        ) as total_task:
+            if cursor is not None:
+                results, next_ = await keyset_paginate(
+                    query, sort_by, User.id, cursor, limit, ascending
+                )
+            else:
+                ordered = keyset_order(query, sort_by, User.id, ascending)
+                results = await paginate(ordered, page, limit).gino.all()
+                next_ = next_cursor(results, sort_by, limit)
+
+            total, estimated = await total_task
+
+        return {
+            "total": total,
+            "total_estimated": estimated,
+            "page": page,
+            "limit": limit,
+            "next_cursor": next_,
+            "results": self.dict_all(results),
+        }
 
     @multiroute("/api/v1/users", methods=["POST"], other_methods=["GET"])
     @json
@@ -120,14 +151,14 @@ class Users(RouteCog):
 
         user = User(username=username, email=email)
 
-        user.password = Authenticator.hash_password(password)
+        user.password = await Authenticator.hash_password(password)
         user.last_pass_reset = datetime.now()
 
         await user.create()
 
         token = jwt_service.make_email_token(user.id, user.email)
 
-        await mailer.send_mail(
+        await mail_outbox.enqueue(
             MailTemplates.VerifyEmail,
             email,
             {
@@ -135,10 +166,9 @@ class Users(RouteCog):
                 "TOKEN": token,
                 "BASE_URL": SETTINGS["EMAIL_BASE"],
             },
-            session=self.core.aioh_sess,
         )
 
-        return jsonify(user.to_dict())
+        return user.to_dict()
 
     @route("/api/v1/users/<user_id>", methods=["GET"])
     @json
@@ -158,7 +188,7 @@ class Users(RouteCog):
         if user is None:
             abort(404, "Unknown user")
 
-        return jsonify(user.to_dict() if not is_through_atme else user.to_self_dict())
+        return user.to_dict() if not is_through_atme else user.to_self_dict()
 
     @route("/api/v1/users/@me", methods=["PATCH"])
     @requires_login
@@ -179,18 +209,19 @@ class Users(RouteCog):
 
         user = await User.get(user_id)
 
-        if not Authenticator.compare_password(old_password, user.password):
+        if not await Authenticator.compare_password(old_password, user.password):
             abort(403, "`old_password` doesn't match")
 
         updates = user.update(**kwargs)
 
         if password is not None:
-            password = Authenticator.hash_password(password)
+            password = await Authenticator.hash_password(password)
             updates = updates.update(password=password, last_pass_reset=datetime.now())
 
         await updates.apply()
+        await token_cache.invalidate(user_id)
 
-        return jsonify(user.to_dict())
+        return user.to_dict()
 
     @route("/api/v1/users/<user_id>/favorites")
     @json
@@ -210,7 +241,7 @@ class Users(RouteCog):
         favorite_pairs = [x.mod_id for x in favorite_pairs]
         favorites = await Mod.query.where(Mod.id.in_(favorite_pairs)).gino.all()
 
-        return jsonify(self.dict_all(favorites))
+        return self.dict_all(favorites)
 
     @route("/api/v1/users/<user_id>/mods")
     @json
@@ -228,7 +259,7 @@ class Users(RouteCog):
         mod_pairs = [x.mod_id for x in mod_pairs]
         mods = await Mod.query.where(Mod.id.in_(mod_pairs)).gino.all()
 
-        return jsonify(self.dict_all(mods))
+        return self.dict_all(mods)
 
     @route("/api/v1/users/<user_id>/reviews")
     @json
@@ -244,7 +275,7 @@ class Users(RouteCog):
 
         reviews = await Review.query.where(Review.author_id == user_id).gino.all()
 
-        return jsonify(self.dict_all(reviews))
+        return self.dict_all(reviews)
 
     @route("/api/v1/users/<user_id>/report", methods=["POST"])
     @json
@@ -274,7 +305,7 @@ class Users(RouteCog):
         report = await UserReport.create(
             content=content, author_id=author_id, user_id=user_id, type=type
         )
-        return jsonify(report.to_dict())
+        return report.to_dict()
 
 
 def setup(core: Sayonika):
@@ -0,0 +1,106 @@
+# Stdlib
+from datetime import datetime
+import os
+from uuid import uuid4
+
+# External Libraries
+from aioredis import RedisError
+from asyncpg import PostgresError
+import pytest
+from sqlalchemy.engine.url import URL
+
+# Mail isn't sent in tests, but the mailer needs a key to be set up.
+os.environ.setdefault("SAYONIKA_MAILGUN_KEY", "testing")
+
+# Sayonika Internals
+from framework.db import DRIVER, QueryStats
+from framework.models import User
+from framework.objects import db, loop, redis, jwt_service, sayonika_instance
+from framework.settings import SETTINGS
+
+
+@pytest.fixture(scope="session")
+def app():
+    """The app, bound to a fresh test database. Skips without Postgres and Redis."""
+    try:
+        loop.run_until_complete(
+            db.set_bind(
+                URL(
+                    DRIVER,
+                    username=SETTINGS["DB_USER"],
+                    password=SETTINGS["DB_PASS"],
+                    host=SETTINGS["DB_HOST"],
+                    port=SETTINGS["DB_PORT"],
+                    database=SETTINGS.get("TEST_DB_NAME", "sayonika_test"),
+                )
+            )
+        )
+        loop.run_until_complete(redis.ping())
+    except (PostgresError, RedisError, OSError) as e:
+        pytest.skip(f"Postgres and Redis are needed to test against: {e}")
+
+    loop.run_until_complete(db.gino.create_all())
+    sayonika_instance.gather("routes")
+    sayonika_instance.testing = True
+
+    yield sayonika_instance
+
+    loop.run_until_complete(db.gino.drop_all())
+    loop.run_until_complete(db.pop_bind().close())
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(app):
+    """Creates users with unique names, allowed to do anything but administration."""
+
+    def make(**kwargs) -> User:
+        name = uuid4().hex[:16]
+
+        return loop.run_until_complete(
+            User.create(
+                **{
+                    "email": f"{name}@sayonika.moe",
+                    "username": name,
+                    "email_verified": True,
+                    "supporter": True,
+                    "password": b"",
+                    "last_pass_reset": datetime.utcnow(),
+                    **kwargs,
+                }
+            )
+        )
+
+    return make
+
+
+@pytest.fixture
+def user(make_user) -> User:
+    return make_user()
+
+
+@pytest.fixture
+def auth(user) -> dict:
+    """Headers authenticating requests as `user`."""
+    return {
+        "Authorization": jwt_service.make_login_token(user.id, user.last_pass_reset)
+    }
+
+
+@pytest.fixture
+def statements(monkeypatch) -> list:
+    """Every statement the requests made from here on run, in order."""
+    recorded = []
+    add = QueryStats.add
+
+    def record(self, statement: str, elapsed: float):
+        recorded.append(statement)
+        add(self, statement, elapsed)
+
+    monkeypatch.setattr(QueryStats, "add", record)
+
+    return recorded
@@ -0,0 +1,56 @@
+# Stdlib
+from uuid import uuid4
+
+# External Libraries
+import pytest
+
+# Sayonika Internals
+from framework.models import Mod, User, ModAuthor, ModStatus, AuthorRole, ModCategory
+from framework.objects import loop, token_cache
+from framework.token_cache import AuthRecord
+
+
+@pytest.fixture(autouse=True)
+def uncached_users(monkeypatch):
+    """Loads users from the database every time, so every lookup is a query."""
+
+    async def get(id_: str):
+        user = await User.get(id_)
+
+        if user is None:
+            return None
+
+        return AuthRecord(**{k: getattr(user, k) for k in AuthRecord._fields})
+
+    monkeypatch.setattr(token_cache, "get", get)
+
+
+@pytest.fixture
+def mod(user) -> Mod:
+    """A mod owned by `user`."""
+    mod = loop.run_until_complete(
+        Mod.create(
+            title=f"Test {uuid4().hex[:16]}",
+            tagline="Testing",
+            description="Testing",
+            website="https://sayonika.moe",
+            status=ModStatus.planning,
+            category=ModCategory.tools,
+        )
+    )
+    loop.run_until_complete(
+        ModAuthor.create(user_id=user.id, mod_id=mod.id, role=AuthorRole.owner)
+    )
+
+    return mod
+
+
+def test_stacked_wrappers_share_user_lookup(client, mod, auth, statements):
+    # `upload` is wrapped by both `requires_login` and `requires_supporter`.
+    response = loop.run_until_complete(
+        client.post(f"/api/v1/mods/{mod.id}/upload_content", headers=auth)
+    )
+
+    # Made it through both wrappers, to the route saying it isn't done yet.
+    assert response.status_code == 501
+    assert len([x for x in statements if 'FROM "user"' in x]) == 1
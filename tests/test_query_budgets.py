@@ -0,0 +1,98 @@
+# Stdlib
+import base64
+import io
+from uuid import uuid4
+
+# External Libraries
+from PIL import Image
+import pytest
+
+# Sayonika Internals
+from framework.models import Mod, ModAuthor, ModStatus, AuthorRole, ModCategory
+from framework.objects import loop
+import routes.mods
+
+DESCRIPTION = "A mod only made to count the queries of the routes handling it. " * 2
+
+
+def make_image() -> str:
+    buf = io.BytesIO()
+    Image.new("RGB", (1, 1)).save(buf, "PNG")
+
+    return f"data:image/png;base64,{base64.b64encode(buf.getvalue()).decode()}"
+
+
+@pytest.fixture(autouse=True)
+def passing_recaptcha(monkeypatch):
+    async def verify_recaptcha(*args):
+        return 1.0
+
+    monkeypatch.setattr(routes.mods, "verify_recaptcha", verify_recaptcha)
+
+
+def request(client, method: str, path: str, **kwargs):
+    response = loop.run_until_complete(client.open(path, method=method, **kwargs))
+
+    return response, loop.run_until_complete(response.get_data(False))
+
+
+def test_post_mods_budget(client, auth, make_user, statements):
+    # Everything that takes queries is given, so the budget holds for any mod.
+    author, playtester = make_user(), make_user()
+    response, body = request(
+        client,
+        "POST",
+        "/api/v1/mods",
+        headers=auth,
+        json={
+            "title": f"Test {uuid4().hex[:16]}",
+            "tagline": "Testing",
+            "description": DESCRIPTION,
+            "website": "https://sayonika.moe",
+            "status": "planning",
+            "category": "tools",
+            "authors": [{"id": author.id, "role": "co_owner"}],
+            "icon": make_image(),
+            "banner": make_image(),
+            "media": [make_image(), make_image()],
+            "is_private_beta": True,
+            "mod_playtester": [playtester.id],
+            "recaptcha": "testing",
+        },
+    )
+
+    assert response.status_code == 200, body
+    assert len(statements) <= 10
+
+
+def test_patch_mod_budget(client, user, auth, make_user, statements):
+    author, playtester = make_user(), make_user()
+    mod = loop.run_until_complete(
+        Mod.create(
+            title=f"Test {uuid4().hex[:16]}",
+            tagline="Testing",
+            description=DESCRIPTION,
+            website="https://sayonika.moe",
+            status=ModStatus.planning,
+            category=ModCategory.tools,
+        )
+    )
+    loop.run_until_complete(
+        ModAuthor.create(user_id=user.id, mod_id=mod.id, role=AuthorRole.owner)
+    )
+    response, body = request(
+        client,
+        "PATCH",
+        f"/api/v1/mods/{mod.id}",
+        headers=auth,
+        json={
+            "title": f"Test {uuid4().hex[:16]}",
+            "authors": [{"id": author.id, "role": "co_owner"}],
+            "icon": make_image(),
+            "banner": make_image(),
+            "mod_playtester": [playtester.id],
+        },
+    )
+
+    assert response.status_code == 200, body
+    assert len(statements) <= 9